@@ -6,20 +6,28 @@ FastAPI backend with LangGraph workflow orchestration
 from fastapi import FastAPI, HTTPException, Request, Body, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field, EmailStr, validator
-from typing import Optional, List, Dict, Any, Literal, Union
+from typing import Optional, List, Dict, Any, Literal, Union, ClassVar
 from datetime import datetime, timedelta
 import os
 import asyncio
 import json
 import httpx
 from pathlib import Path
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass
 from enum import Enum
+from functools import lru_cache
+import string
 import uuid
 import logging
 from tinydb import TinyDB, Query
 from tinydb.table import Document
+from tinydb.middlewares import CachingMiddleware
+from tinydb.storages import JSONStorage
 from dotenv import load_dotenv
 import time
 from tenacity import retry, stop_after_attempt, wait_exponential
@@ -28,11 +36,13 @@ from email.message import EmailMessage
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from langgraph.graph import StateGraph, END
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.types import interrupt, Command
 from typing import TypedDict, Annotated
 import operator
 import openai
+import orjson
 
 # Load environment variables
 load_dotenv()
@@ -96,17 +106,55 @@ class OnboardingStatus(BaseModel):
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     last_updated: datetime = Field(default_factory=datetime.now)
-    
+    # Integer nanosecond token for cheap sort/compare without constructing
+    # datetime objects on the hot path
+    last_updated_ns: int = Field(default_factory=time.time_ns)
+
+    # Completed steps packed into a bitmask (one bit per STEP_FIELDS entry,
+    # maintained on every status transition) so progress is a single popcount
+    # instead of 12 string comparisons
+    progress_mask: int = 0
+
+    TOTAL_STEPS: ClassVar[int] = 12
+    STEP_FIELDS: ClassVar[tuple] = (
+        'company_policy_sent', 'company_policy_signed', 'company_policy_quiz_passed',
+        'nda_sent', 'nda_signed', 'nda_quiz_passed',
+        'dev_guidelines_sent', 'dev_guidelines_signed', 'dev_guidelines_quiz_passed',
+        'slack_invite_sent', 'jira_access_granted', 'onboarding_call_scheduled'
+    )
+    STEP_BITS: ClassVar[Dict[str, int]] = {
+        field: 1 << i for i, field in enumerate(STEP_FIELDS)
+    }
+    # Progress is a pure function of the popcount, which only takes
+    # TOTAL_STEPS + 1 values, so every possible result is precomputed
+    # (literal 12 here: class-body genexps can't see TOTAL_STEPS)
+    PROGRESS_BY_COUNT: ClassVar[tuple] = tuple(
+        round((i / 12) * 100, 2) for i in range(13)
+    )
+
+    @classmethod
+    def compute_progress_mask(cls, status_data: Dict[str, Any]) -> int:
+        """Rebuild the mask from raw field values (migration helper)"""
+        mask = 0
+        for field, bit in cls.STEP_BITS.items():
+            if status_data.get(field) == OnboardingStepStatus.COMPLETED:
+                mask |= bit
+        return mask
+
+    @validator('progress_mask', always=True)
+    def backfill_progress_mask(cls, v, values):
+        """Backfill the mask for rows persisted before it existed"""
+        if v == 0:
+            return cls.compute_progress_mask(values)
+        return v
+
+    def is_completed(self, step: str) -> bool:
+        """O(1) bit test for a single step's completion"""
+        return (self.progress_mask & self.STEP_BITS[step]) != 0
+
     def calculate_progress(self) -> float:
         """Calculate overall progress percentage"""
-        steps = [
-            self.company_policy_sent, self.company_policy_signed, self.company_policy_quiz_passed,
-            self.nda_sent, self.nda_signed, self.nda_quiz_passed,
-            self.dev_guidelines_sent, self.dev_guidelines_signed, self.dev_guidelines_quiz_passed,
-            self.slack_invite_sent, self.jira_access_granted, self.onboarding_call_scheduled
-        ]
-        completed = sum(1 for step in steps if step == OnboardingStepStatus.COMPLETED)
-        return round((completed / len(steps)) * 100, 2)
+        return self.PROGRESS_BY_COUNT[self.progress_mask.bit_count()]
 
 class Employee(BaseModel):
     """Employee data model"""
@@ -157,15 +205,37 @@ class EmployeeCreate(BaseModel):
         except ValueError:
             raise ValueError("start_date must be in YYYY-MM-DD format")
 
-class WorkflowState(BaseModel):
-    """State for LangGraph workflow"""
+class DocStatusWebhook(BaseModel):
+    """Body of the doc-esign document-status webhook.
+
+    Typed models push validation into pydantic-core (and let FastAPI
+    return 422s) instead of per-request .get() chains in the handler.
+    doc-esign sends "nda_policy" for the NDA document.
+    """
+    employee_id: str
+    document_type: Literal["company_policy", "nda", "nda_policy", "dev_guidelines"]
+    status: Literal["sent", "signed"]
+
+class QuizStatusWebhook(BaseModel):
+    """Body of the doc-esign quiz-status webhook"""
+    employee_id: str
+    quiz_type: Literal["company_policy_quiz", "nda_quiz", "dev_guidelines_quiz"]
+    score: int
+    passed: bool
+
+class WorkflowState(TypedDict, total=False):
+    """State for LangGraph workflow.
+
+    A TypedDict rather than a BaseModel: LangGraph merges state on every
+    super-step, and plain dicts skip Pydantic's validation/coercion pass
+    per transition. The history channel uses an operator.add reducer so
+    nodes append entries instead of replacing (and re-copying) the list.
+    """
     employee_id: str
     current_step: str
     status: str
-    context: Dict[str, Any] = Field(default_factory=dict)
-    history: List[Dict[str, Any]] = Field(default_factory=list)
-    created_at: datetime = Field(default_factory=datetime.now)
-    updated_at: datetime = Field(default_factory=datetime.now)
+    context: Dict[str, Any]
+    history: Annotated[List[Dict[str, Any]], operator.add]
 
 # ============================================
 # Database Setup
@@ -175,92 +245,257 @@ class WorkflowState(BaseModel):
 data_path = Path(__file__).parent / "data"
 data_path.mkdir(exist_ok=True)
 
+class OrjsonStorage(JSONStorage):
+    """JSONStorage variant that serializes with orjson.
+
+    TinyDB re-serializes the whole database on every flush; orjson is
+    several times faster than stdlib json at both encode and decode, so
+    this shrinks every read/write proportionally. The file on disk stays
+    plain JSON.
+    """
+
+    def __init__(self, path: str, create_dirs=False, access_mode='rb+', **kwargs):
+        # Binary access mode so orjson bytes are written directly
+        super().__init__(path, create_dirs=create_dirs, access_mode=access_mode, **kwargs)
+
+    def read(self):
+        self._handle.seek(0, os.SEEK_END)
+        if not self._handle.tell():
+            # File is empty - let TinyDB initialize the database
+            return None
+        self._handle.seek(0)
+        return orjson.loads(self._handle.read())
+
+    def encode(self, data) -> bytes:
+        # TinyDB uses int doc_ids as dict keys in memory
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+    def write_bytes(self, payload: bytes):
+        self._handle.seek(0)
+        self._handle.write(payload)
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        self._handle.truncate()
+
+    def write(self, data):
+        self.write_bytes(self.encode(data))
+
 db_path = os.getenv("DB_PATH", str(data_path / "employees.db"))
-db = TinyDB(db_path)
-employees_table = db.table('employees')
-workflows_table = db.table('workflows')
+# Resolved once at import for the stats endpoint - Path.absolute() stats
+# the CWD per call, and the old literal pointed at a file that never
+# existed ("hrms.db") rather than the actual database
+_DB_ABSOLUTE_PATH = str(Path(db_path).absolute())
+# CachingMiddleware keeps the parsed JSON in memory so repeat reads don't
+# re-read and re-parse the whole file from disk; cache_size enables TinyDB's
+# smart query cache so repeated lookups for the same employee stay hot.
+db = TinyDB(db_path, storage=CachingMiddleware(OrjsonStorage))
+employees_table = db.table('employees', cache_size=64)
+workflows_table = db.table('workflows', cache_size=64)
+# Email logs live in their own table (one row per entry) so logging an
+# email is an O(1) insert instead of a read-modify-write of the whole
+# employee document
+email_logs_table = db.table('email_logs', cache_size=64)
+
+# Serializes flushes (and nothing else): in-memory mutations are atomic on
+# the event loop, so the lock only has to keep two file writes - or a write
+# and the fsync of a previous one - from interleaving on the shared handle.
+_db_lock = asyncio.Lock()
+
+async def flush_db_async():
+    """Flush the storage cache without stalling the event loop.
+
+    The cache is snapshotted to bytes synchronously (no await, so no other
+    coroutine can mutate it mid-serialization); only the blocking file
+    write + fsync runs in a worker thread, under the DB lock.
+    """
+    middleware = db.storage
+    async with _db_lock:
+        if middleware.cache is None or not middleware._cache_modified_count:
+            return
+        payload = middleware.storage.encode(middleware.cache)
+        middleware._cache_modified_count = 0
+        await asyncio.get_running_loop().run_in_executor(
+            None, middleware.storage.write_bytes, payload
+        )
 
 # Query builder
 EmployeeQuery = Query()
 
+@lru_cache(maxsize=1024)
+def _query_by_id(employee_id: str):
+    return EmployeeQuery.id == employee_id
+
+@lru_cache(maxsize=1024)
+def _query_by_email(email: str):
+    return EmployeeQuery.email == email
+
+@lru_cache(maxsize=1024)
+def _query_by_thread(thread_id: str):
+    return EmployeeQuery.workflow_thread_id == thread_id
+
+class EmployeeIndex:
+    """In-memory index over employees_table for O(1) lookups.
+
+    TinyDB resolves `EmployeeQuery.<field> == value` with a linear scan over
+    every document, which degrades badly as the roster grows. This keeps
+    dict maps from id / email / workflow_thread_id to TinyDB doc_ids so hot
+    paths (webhooks, workflow nodes, status polling) resolve documents with
+    a direct `table.get(doc_id=...)` instead of a full scan. TinyDB remains
+    the durable store; the index is rebuilt on process start.
+    """
+
+    def __init__(self, table):
+        self._table = table
+        self._by_id: Dict[str, int] = {}
+        self._by_email: Dict[str, int] = {}
+        self._by_thread: Dict[str, int] = {}
+        self.rebuild()
+
+    def rebuild(self):
+        """Rebuild all maps from the underlying table"""
+        self._by_id.clear()
+        self._by_email.clear()
+        self._by_thread.clear()
+        for doc in self._table.all():
+            self.register(doc, doc.doc_id)
+
+    def register(self, doc: dict, doc_id: int):
+        """Add or refresh index entries for a document"""
+        if doc.get('id'):
+            self._by_id[doc['id']] = doc_id
+        if doc.get('email'):
+            self._by_email[doc['email']] = doc_id
+        if doc.get('workflow_thread_id'):
+            self._by_thread[doc['workflow_thread_id']] = doc_id
+
+    def clear(self):
+        """Drop all index entries (e.g. after table truncate)"""
+        self._by_id.clear()
+        self._by_email.clear()
+        self._by_thread.clear()
+
+    def doc_id_for(self, employee_id: str) -> Optional[int]:
+        """Resolve employee id to doc_id, falling back to a scan on miss"""
+        doc_id = self._by_id.get(employee_id)
+        if doc_id is None:
+            result = self._table.search(_query_by_id(employee_id))
+            if result:
+                doc_id = result[0].doc_id
+                self.register(result[0], doc_id)
+        return doc_id
+
+    def get_by_id(self, employee_id: str):
+        """Get employee document by id - O(1) via index"""
+        doc_id = self.doc_id_for(employee_id)
+        return self._table.get(doc_id=doc_id) if doc_id is not None else None
+
+    def get_by_email(self, email: str):
+        """Get employee document by email - O(1) via index"""
+        doc_id = self._by_email.get(email)
+        if doc_id is None:
+            result = self._table.search(_query_by_email(email))
+            if result:
+                doc_id = result[0].doc_id
+                self.register(result[0], doc_id)
+        return self._table.get(doc_id=doc_id) if doc_id is not None else None
+
+    def get_by_thread_id(self, thread_id: str):
+        """Get employee document by workflow thread id - O(1) via index"""
+        doc_id = self._by_thread.get(thread_id)
+        if doc_id is None:
+            result = self._table.search(_query_by_thread(thread_id))
+            if result:
+                doc_id = result[0].doc_id
+                self.register(result[0], doc_id)
+        return self._table.get(doc_id=doc_id) if doc_id is not None else None
+
+# Index over the employees table, rebuilt at startup
+employee_index = EmployeeIndex(employees_table)
+
 # ============================================
 # External Service Integration
 # ============================================
 
+# Map document types to doc-esign document IDs (constant across calls)
+_DOC_ID_MAP = {
+    "company_policy": "company_policy",
+    "nda": "nda_policy",
+    "dev_guidelines": "dev_guidelines"
+}
+
+# HRMS webhook base URL for doc-esign callbacks
+_WEBHOOK_BASE = os.getenv("HRMS_WEBHOOK_BASE_URL", "https://hrms-ai-onboarding.onrender.com")
+
 class DocEsignService:
     """Integration with doc-esign service"""
     
     def __init__(self):
         self.base_url = os.getenv("DOC_ESIGN_API_URL", "https://doc-esign.onrender.com")
         self.timeout = int(os.getenv("SERVICE_TIMEOUT", "30"))
-    
+        # Shared pooled client - one TLS handshake per process instead of per call
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
+        )
+
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     async def send_document(self, employee_email: str, document_type: str, employee_id: str = None) -> Dict[str, Any]:
         """Send document for signature via doc-esign service"""
         logger.info(f"📤 SENDING DOCUMENT: {document_type} to {employee_email}")
         logger.info(f"📍 Using doc-esign service at: {self.base_url}")
         
-        # Map document types to doc-esign document IDs
-        document_mapping = {
-            "company_policy": "company_policy",
-            "nda": "nda_policy",
-            "dev_guidelines": "dev_guidelines"
-        }
-        
-        document_id = document_mapping.get(document_type, document_type)
-        
-        # Get HRMS webhook base URL
-        webhook_base_url = os.getenv("HRMS_WEBHOOK_BASE_URL", "https://hrms-ai-onboarding.onrender.com")
-        
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                # Include employee_id and webhook URLs for callbacks
-                request_data = {
-                    "document_id": document_id,
-                    "sender_email": "vivek.agarwal@progressionschool.com",
-                    "sender_name": "HR Department",
-                    "receiver_email": employee_email,
-                    "purpose": f"Please review and sign the {document_type.replace('_', ' ').title()}",
-                    "employee_id": employee_id,
-                    "webhook_base_url": webhook_base_url
-                }
-                
-                logger.debug(f"📨 Request to doc-esign: {request_data}")
-                
-                response = await client.post(
-                    f"{self.base_url}/api/send-document",
-                    json=request_data
-                )
-                
-                logger.debug(f"📬 Response status: {response.status_code}")
-                logger.debug(f"📬 Response headers: {response.headers}")
-                
-                response.raise_for_status()
-                result = response.json()
-                
-                logger.info(f"✅ Document {document_type} sent successfully to {employee_email}")
-                logger.info(f"📋 Tracking ID: {result.get('data', {}).get('tracking_id')}")
-                logger.info(f"🔗 Signing URL: {result.get('data', {}).get('signing_url')}")
-                
-                return result.get('data', {})
-                
-            except httpx.HTTPStatusError as e:
-                logger.error(f"❌ HTTP Error sending document: {e}")
-                logger.error(f"Response: {e.response.text if e.response else 'No response'}")
-                
-                # Fallback to simulation for testing
-                logger.warning(f"⚠️ Falling back to simulation mode")
-                return self._simulate_document_send(employee_email, document_type)
-                
-            except Exception as e:
-                logger.error(f"❌ Error sending document: {e}")
-                # Fallback to simulation
-                return self._simulate_document_send(employee_email, document_type)
+        document_id = _DOC_ID_MAP.get(document_type, document_type)
+        webhook_base_url = _WEBHOOK_BASE
+
+        try:
+            # Include employee_id and webhook URLs for callbacks
+            request_data = {
+                "document_id": document_id,
+                "sender_email": "vivek.agarwal@progressionschool.com",
+                "sender_name": "HR Department",
+                "receiver_email": employee_email,
+                "purpose": f"Please review and sign the {document_type.replace('_', ' ').title()}",
+                "employee_id": employee_id,
+                "webhook_base_url": webhook_base_url
+            }
+
+            logger.debug(f"📨 Request to doc-esign: {request_data}")
+
+            response = await self.client.post(
+                "/api/send-document",
+                json=request_data
+            )
+
+            logger.debug(f"📬 Response status: {response.status_code}")
+            logger.debug(f"📬 Response headers: {response.headers}")
+
+            response.raise_for_status()
+            result = response.json()
+
+            logger.info(f"✅ Document {document_type} sent successfully to {employee_email}")
+            logger.info(f"📋 Tracking ID: {result.get('data', {}).get('tracking_id')}")
+            logger.info(f"🔗 Signing URL: {result.get('data', {}).get('signing_url')}")
+
+            return result.get('data', {})
+
+        except httpx.HTTPStatusError as e:
+            logger.error(f"❌ HTTP Error sending document: {e}")
+            logger.error(f"Response: {e.response.text if e.response else 'No response'}")
+
+            # Fallback to simulation for testing
+            logger.warning(f"⚠️ Falling back to simulation mode")
+            return self._simulate_document_send(employee_email, document_type)
+
+        except Exception as e:
+            logger.error(f"❌ Error sending document: {e}")
+            # Fallback to simulation
+            return self._simulate_document_send(employee_email, document_type)
     
     def _simulate_document_send(self, employee_email: str, document_type: str) -> Dict[str, Any]:
         """Fallback simulation when doc-esign is unavailable"""
         simulated_response = {
-            "tracking_id": f"sim_{document_type}_{int(datetime.now().timestamp())}",
+            "tracking_id": f"sim_{document_type}_{time.time_ns()}",
             "status": "sent",
             "signing_url": f"https://doc-esign.onrender.com/sign/simulated_{document_type}"
         }
@@ -270,126 +505,197 @@ class DocEsignService:
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     async def check_signature_status(self, document_id: str) -> Dict[str, Any]:
         """Check document signature status"""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/api/documents/{document_id}/status"
-                )
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                logger.error(f"Error checking signature status: {e}")
-                raise
+        try:
+            response = await self.client.get(
+                f"/api/documents/{document_id}/status"
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error checking signature status: {e}")
+            raise
     
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     async def get_quiz(self, quiz_type: str) -> Dict[str, Any]:
         """Get quiz questions"""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/api/quizzes/{quiz_type}"
-                )
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                logger.error(f"Error getting quiz: {e}")
-                raise
+        try:
+            response = await self.client.get(
+                f"/api/quizzes/{quiz_type}"
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error getting quiz: {e}")
+            raise
     
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     async def submit_quiz(self, employee_id: str, quiz_type: str, answers: List[Dict]) -> Dict[str, Any]:
         """Submit quiz answers"""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.post(
-                    f"{self.base_url}/api/quizzes/submit",
-                    json={
-                        "employee_id": employee_id,
-                        "quiz_type": quiz_type,
-                        "answers": answers,
-                        "callback_url": f"{os.getenv('API_BASE_URL', 'http://localhost:8000')}/api/webhooks/quiz-status"
-                    }
-                )
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                logger.error(f"Error submitting quiz: {e}")
-                raise
+        try:
+            response = await self.client.post(
+                "/api/quizzes/submit",
+                json={
+                    "employee_id": employee_id,
+                    "quiz_type": quiz_type,
+                    "answers": answers,
+                    "callback_url": f"{os.getenv('API_BASE_URL', 'http://localhost:8000')}/api/webhooks/quiz-status"
+                }
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error submitting quiz: {e}")
+            raise
+
+# Disk-backed cache of OpenAI-generated email content. The prompts are
+# deterministic in (template_type, role, department, document_type,
+# quiz_type) once the employee name is replaced by a placeholder, so one
+# LLM call serves every employee with the same role/department. Persisted
+# under data/ so it survives restarts.
+_email_content_cache_path = data_path / "email_content_cache.json"
+
+def _load_email_content_cache() -> Dict[str, str]:
+    try:
+        with open(_email_content_cache_path) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def _save_email_content_cache():
+    try:
+        with open(_email_content_cache_path, 'w') as f:
+            json.dump(_email_content_cache, f)
+    except OSError as e:
+        logger.warning(f"Could not persist email content cache: {e}")
+
+_email_content_cache = _load_email_content_cache()
+
+class _SafeDict(dict):
+    """format_map() helper - substitutes sensible fallbacks for missing keys"""
+    _FALLBACKS = {"document_type": "document", "quiz_type": "quiz"}
+
+    def __missing__(self, key):
+        return self._FALLBACKS.get(key, "")
+
+# Prompt/fallback templates hoisted to module scope so each call formats
+# only the one template it needs instead of building all seven f-strings.
+# {{NAME}} survives format_map as a literal {NAME} for post-generation
+# substitution.
+_PROMPT_TEMPLATES = {
+    "welcome": "Write a warm, professional welcome email for {{NAME}} who is joining as {role} in {department}. Include excitement about them joining the team.",
+    "document_ready": "Write a brief email notifying {{NAME}} that their {document_type} is ready for review and signature.",
+    "quiz_reminder": "Write a friendly reminder email for {{NAME}} to complete their {quiz_type}.",
+    "onboarding_complete": "Write a congratulatory email for {{NAME}} who has completed their onboarding. Welcome them officially to the team.",
+    "slack_invite": "Write an email inviting {{NAME}} to join the company Slack workspace with instructions.",
+    "jira_access": "Write an email informing {{NAME}} that their Jira access has been granted with basic getting started tips.",
+    "meeting_scheduled": "Write an email confirming the onboarding call has been scheduled for {{NAME}} with their manager."
+}
+
+_DEFAULT_CONTENT_TEMPLATES = {
+    "welcome": "Welcome to the team, {name}! We're excited to have you join us as {role}.",
+    "document_ready": "Hi {name}, Your document is ready for review and signature.",
+    "quiz_reminder": "Hi {name}, Please complete your onboarding quiz at your earliest convenience.",
+    "onboarding_complete": "Congratulations {name}! You've successfully completed your onboarding.",
+    "slack_invite": "Hi {name}, You've been invited to join our Slack workspace.",
+    "jira_access": "Hi {name}, Your Jira access has been granted.",
+    "meeting_scheduled": "Hi {name}, Your onboarding call has been scheduled."
+}
 
 class EmailService:
     """Integration with email webhook service"""
-    
+
     def __init__(self):
         self.webhook_url = os.getenv("EMAIL_WEBHOOK_URL", "https://hook.eu2.make.com/57dd2q56dzq8yis4qbkrlt5p473i7q5e")
         self.timeout = int(os.getenv("SERVICE_TIMEOUT", "30"))
-        self.client = openai.OpenAI() if openai_api_key else None
+        # Async client so the OpenAI round-trip doesn't block the event loop
+        self.client = openai.AsyncOpenAI() if openai_api_key else None
+        # Shared pooled client for the email webhook - reuses keep-alive connections
+        self.http_client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
+        )
     
     async def generate_email_content(self, template_type: str, employee_data: Dict) -> str:
-        """Generate email content using OpenAI"""
+        """Generate email content using OpenAI, cached per (template, role, department)"""
         if not self.client:
             return self._get_default_content(template_type, employee_data)
-        
+
+        # Employee name is a post-generation substitution, so the cache key
+        # only needs the template-invariant parts of the prompt
+        cache_key = "|".join([
+            template_type,
+            employee_data.get('role', ''),
+            employee_data.get('department', ''),
+            employee_data.get('document_type', ''),
+            employee_data.get('quiz_type', '')
+        ])
+        cached = _email_content_cache.get(cache_key)
+        if cached is not None:
+            return cached.replace("{NAME}", employee_data['name'])
+
         try:
-            prompts = {
-                "welcome": f"Write a warm, professional welcome email for {employee_data['name']} who is joining as {employee_data['role']} in {employee_data['department']}. Include excitement about them joining the team.",
-                "document_ready": f"Write a brief email notifying {employee_data['name']} that their {employee_data.get('document_type', 'document')} is ready for review and signature.",
-                "quiz_reminder": f"Write a friendly reminder email for {employee_data['name']} to complete their {employee_data.get('quiz_type', 'quiz')}.",
-                "onboarding_complete": f"Write a congratulatory email for {employee_data['name']} who has completed their onboarding. Welcome them officially to the team.",
-                "slack_invite": f"Write an email inviting {employee_data['name']} to join the company Slack workspace with instructions.",
-                "jira_access": f"Write an email informing {employee_data['name']} that their Jira access has been granted with basic getting started tips.",
-                "meeting_scheduled": f"Write an email confirming the onboarding call has been scheduled for {employee_data['name']} with their manager."
-            }
-            
-            prompt = prompts.get(template_type, prompts["welcome"])
-            
-            response = self.client.chat.completions.create(
+            prompt = _PROMPT_TEMPLATES.get(
+                template_type, _PROMPT_TEMPLATES["welcome"]
+            ).format_map(_SafeDict(employee_data))
+
+            response = await self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
-                    {"role": "system", "content": "You are a helpful HR assistant writing professional onboarding emails. Keep emails concise and friendly."},
+                    {"role": "system", "content": "You are a helpful HR assistant writing professional onboarding emails. Keep emails concise and friendly. Address the recipient with the literal placeholder {NAME} wherever their name would appear - do not invent a name."},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=300
             )
-            
-            return response.choices[0].message.content
+
+            content = response.choices[0].message.content
+            _email_content_cache[cache_key] = content
+            _save_email_content_cache()
+            return content.replace("{NAME}", employee_data['name'])
         except Exception as e:
             logger.error(f"Error generating email content: {e}")
             return self._get_default_content(template_type, employee_data)
     
     def _get_default_content(self, template_type: str, employee_data: Dict) -> str:
         """Get default email content if OpenAI is not available"""
-        templates = {
-            "welcome": f"Welcome to the team, {employee_data['name']}! We're excited to have you join us as {employee_data['role']}.",
-            "document_ready": f"Hi {employee_data['name']}, Your document is ready for review and signature.",
-            "quiz_reminder": f"Hi {employee_data['name']}, Please complete your onboarding quiz at your earliest convenience.",
-            "onboarding_complete": f"Congratulations {employee_data['name']}! You've successfully completed your onboarding.",
-            "slack_invite": f"Hi {employee_data['name']}, You've been invited to join our Slack workspace.",
-            "jira_access": f"Hi {employee_data['name']}, Your Jira access has been granted.",
-            "meeting_scheduled": f"Hi {employee_data['name']}, Your onboarding call has been scheduled."
-        }
-        return templates.get(template_type, templates["welcome"])
+        return _DEFAULT_CONTENT_TEMPLATES.get(
+            template_type, _DEFAULT_CONTENT_TEMPLATES["welcome"]
+        ).format_map(_SafeDict(employee_data))
     
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     async def send_email(self, to_email: str, subject: str, body: str, template_type: str = "default") -> Dict[str, Any]:
         """Send email via webhook"""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                payload = {
-                    "to": to_email,
-                    "subject": subject,
-                    "body": body,
-                    "from_name": "HR Department",
-                    "from_email": "vivek.agarwal@progressionschool.com",
-                    "timestamp": datetime.now().isoformat()
-                }
-                
-                response = await client.post(self.webhook_url, json=payload)
-                response.raise_for_status()
-                
-                logger.info(f"Email sent to {to_email}: {subject}")
-                return {"status": "sent", "timestamp": datetime.now().isoformat()}
-            except Exception as e:
-                logger.error(f"Error sending email: {e}")
-                return {"status": "failed", "error": str(e), "timestamp": datetime.now().isoformat()}
+        now_iso = datetime.now().isoformat()
+        try:
+            payload = {
+                "to": to_email,
+                "subject": subject,
+                "body": body,
+                "from_name": "HR Department",
+                "from_email": "vivek.agarwal@progressionschool.com",
+                "timestamp": now_iso
+            }
+
+            response = await self.http_client.post(self.webhook_url, json=payload)
+            response.raise_for_status()
+
+            logger.info(f"Email sent to {to_email}: {subject}")
+            return {"status": "sent", "timestamp": now_iso}
+        except Exception as e:
+            logger.error(f"Error sending email: {e}")
+            return {"status": "failed", "error": str(e), "timestamp": datetime.now().isoformat()}
+
+    async def send_batch(self, messages: List[Dict[str, Any]]) -> List[Any]:
+        """Send several emails over the shared pooled client in one burst.
+
+        All posts reuse this service's keep-alive connections, so a batch
+        costs one connection setup instead of one per message. Failures are
+        returned in-slot (exception or failed-status dict) rather than
+        raised, so one bad message cannot cancel its siblings.
+        """
+        return await asyncio.gather(
+            *(self.send_email(**message) for message in messages),
+            return_exceptions=True
+        )
 
 # Initialize services
 doc_esign_service = DocEsignService()
@@ -399,6 +705,17 @@ email_service = EmailService()
 # LangGraph Workflow
 # ============================================
 
+@dataclass(slots=True, frozen=True)
+class HistoryEntry:
+    """Single append-only workflow history record.
+
+    A slotted frozen dataclass instead of a dict: ~2-3x smaller per entry
+    and cheaper to serialize into checkpoints.
+    """
+    step: str
+    status: str
+    ts_ns: int
+
 class OnboardingState(TypedDict):
     """State for onboarding workflow"""
     employee_id: str
@@ -412,43 +729,101 @@ class OnboardingState(TypedDict):
     documents_signed: List[str]
     quizzes_passed: List[str]
     final_tasks_status: Dict[str, bool]
+    # Routing flags kept in state so downstream nodes don't re-read the DB
+    # to re-verify what the graph itself already confirmed
+    company_policy_signed: bool
+    nda_signed: bool
+    dev_guidelines_signed: bool
+    quiz_passes: Dict[str, bool]
+    # Reducer channel: nodes put only *new* entries here and LangGraph
+    # appends them, so the growing history is never copied per step
+    history: Annotated[List[HistoryEntry], operator.add]
+
+def _record_history(state: OnboardingState, step: str, status: str):
+    """Queue a history entry for the reducer to append.
+
+    Nodes clear the history key on entry (see each node's first line), so
+    whatever is left in it at return time is the delta for this step only.
+    """
+    state["history"] = (state.get("history") or []) + [
+        HistoryEntry(step=step, status=status, ts_ns=time.time_ns())
+    ]
 
-async def send_company_policy_node(state: OnboardingState) -> OnboardingState:
-    """Send company policy document"""
+@dataclass(slots=True, frozen=True)
+class DocumentStep:
+    """Static spec for one document-send step, hoisted so the per-node work
+    is only the per-employee substitution"""
+    document: str
+    step_key: str
+    wait_step: str
+    history_step: str
+    label: str
+    error_label: str
+
+_COMPANY_POLICY_STEP = DocumentStep(
+    document=DocumentType.COMPANY_POLICY.value,
+    step_key="company_policy_sent",
+    wait_step="wait_company_policy_signature",
+    history_step="send_company_policy",
+    label="Company policy",
+    error_label="company policy",
+)
+_NDA_STEP = DocumentStep(
+    document=DocumentType.NDA.value,
+    step_key="nda_sent",
+    wait_step="wait_nda_signature",
+    history_step="send_nda",
+    label="NDA",
+    error_label="NDA",
+)
+_DEV_GUIDELINES_STEP = DocumentStep(
+    document=DocumentType.DEV_GUIDELINES.value,
+    step_key="dev_guidelines_sent",
+    wait_step="wait_dev_guidelines_signature",
+    history_step="send_dev_guidelines",
+    label="Dev guidelines",
+    error_label="dev guidelines",
+)
+
+async def _send_document_step(state: OnboardingState, spec: DocumentStep) -> OnboardingState:
+    """Shared esign-send/state-update/status-queue body of the three send nodes"""
     employee_data = state["employee_data"]
     try:
-        result = await doc_esign_service.send_document(
-            employee_data["email"], 
-            DocumentType.COMPANY_POLICY.value,
+        await doc_esign_service.send_document(
+            employee_data["email"],
+            spec.document,
             state["employee_id"]
         )
-        state["documents_sent"].append(DocumentType.COMPANY_POLICY.value)
-        
+        state["documents_sent"].append(spec.document)
+        state["current_step"] = spec.wait_step
+        _record_history(state, spec.history_step, "sent")
+
         # Email already sent by doc-esign service with signing link
         # No need for duplicate email here
-        
-        # Update employee status in DB
-        await update_employee_step_status(
-            state["employee_id"], 
-            "company_policy_sent", 
-            OnboardingStepStatus.COMPLETED
-        )
-        
-        state["current_step"] = "wait_company_policy_signature"
-        logger.info(f"Company policy sent to {employee_data['email']}")
+
+        queue_step_status(state["employee_id"], spec.step_key, OnboardingStepStatus.COMPLETED)
+        logger.info(f"{spec.label} sent to {employee_data['email']}")
     except Exception as e:
-        state["errors"].append(f"Failed to send company policy: {str(e)}")
-        logger.error(f"Error in send_company_policy_node: {e}")
-    
+        state["errors"].append(f"Failed to send {spec.error_label}: {str(e)}")
+        logger.error(f"Error sending {spec.error_label}: {e}")
+
     return state
 
+async def send_company_policy_node(state: OnboardingState) -> OnboardingState:
+    """Send company policy document"""
+    state.pop("history", None)
+    return await _send_document_step(state, _COMPANY_POLICY_STEP)
+
 async def check_company_policy_signed_node(state: OnboardingState) -> OnboardingState:
     """Check if company policy is signed - wait if needed"""
+    state.pop("history", None)
     employee = get_employee_by_id(state["employee_id"])
     if employee and employee.get("onboarding_status", {}).get("company_policy_signed") == OnboardingStepStatus.COMPLETED.value:
         # Already signed via webhook
         state["documents_signed"].append(DocumentType.COMPANY_POLICY.value)
+        state["company_policy_signed"] = True
         state["current_step"] = "company_policy_quiz"
+        _record_history(state, "company_policy_signed", "completed")
         logger.info(f"✅ Company policy signed - proceeding to quiz")
         return state
     else:
@@ -465,13 +840,16 @@ async def check_company_policy_signed_node(state: OnboardingState) -> Onboarding
 
 async def company_policy_quiz_node(state: OnboardingState) -> OnboardingState:
     """Handle company policy quiz - check if completed or wait"""
+    state.pop("history", None)
     employee = get_employee_by_id(state["employee_id"])
     
     # Check if quiz is already passed
     if employee and employee.get("onboarding_status", {}).get("company_policy_quiz_passed") == OnboardingStepStatus.COMPLETED.value:
         # Already passed via webhook
         state["quizzes_passed"].append(QuizType.COMPANY_POLICY_QUIZ.value)
+        state.setdefault("quiz_passes", {})[QuizType.COMPANY_POLICY_QUIZ.value] = True
         state["current_step"] = "nda"
+        _record_history(state, "company_policy_quiz", "passed")
         logger.info(f"✅ Company policy quiz passed - proceeding to NDA")
         return state
     
@@ -488,7 +866,9 @@ async def company_policy_quiz_node(state: OnboardingState) -> OnboardingState:
     employee = get_employee_by_id(state["employee_id"])
     if employee and employee.get("onboarding_status", {}).get("company_policy_quiz_passed") == OnboardingStepStatus.COMPLETED.value:
         state["quizzes_passed"].append(QuizType.COMPANY_POLICY_QUIZ.value)
+        state.setdefault("quiz_passes", {})[QuizType.COMPANY_POLICY_QUIZ.value] = True
         state["current_step"] = "nda"
+        _record_history(state, "company_policy_quiz", "passed")
         logger.info(f"✅ Company policy quiz passed after resume - proceeding to NDA")
         return state
     
@@ -498,55 +878,29 @@ async def company_policy_quiz_node(state: OnboardingState) -> OnboardingState:
 
 async def send_nda_node(state: OnboardingState) -> OnboardingState:
     """Send NDA document - ONLY after company policy completed"""
-    employee_data = state["employee_data"]
-    
-    # Verify company policy is complete first
-    employee = get_employee_by_id(state["employee_id"])
-    if not employee:
-        state["errors"].append("Employee not found")
-        return state
-        
-    status = employee.get("onboarding_status", {})
-    if (status.get("company_policy_signed") != OnboardingStepStatus.COMPLETED.value or 
-        status.get("company_policy_quiz_passed") != OnboardingStepStatus.COMPLETED.value):
+    state.pop("history", None)
+
+    # Verify company policy is complete first - the graph already confirmed
+    # both steps and recorded them in state, so no DB re-read is needed
+    if not (state.get("company_policy_signed") and
+            state.get("quiz_passes", {}).get(QuizType.COMPANY_POLICY_QUIZ.value)):
         logger.warning(f"❌ Cannot send NDA - company policy not complete")
         state["errors"].append("Company policy must be completed first")
         return state
-    
-    try:
-        # Send real NDA via doc-esign
-        result = await doc_esign_service.send_document(
-            employee_data["email"], 
-            DocumentType.NDA.value,
-            state["employee_id"]
-        )
-        state["documents_sent"].append(DocumentType.NDA.value)
-        state["current_step"] = "wait_nda_signature"
-        
-        # Email already sent by doc-esign service with signing link
-        # No need for duplicate email here
-        
-        await update_employee_step_status(
-            state["employee_id"], 
-            "nda_sent", 
-            OnboardingStepStatus.COMPLETED
-        )
-        logger.info(f"NDA sent to {employee_data['email']}")
-        
-    except Exception as e:
-        state["errors"].append(f"Failed to send NDA: {str(e)}")
-        logger.error(f"Error sending NDA: {e}")
-    
-    return state
+
+    return await _send_document_step(state, _NDA_STEP)
 
 async def check_nda_signed_node(state: OnboardingState) -> OnboardingState:
     """Check if NDA is signed - WAIT FOR REAL SIGNATURE"""
+    state.pop("history", None)
     # Check actual status from database
     employee = get_employee_by_id(state["employee_id"])
     if employee and employee.get("onboarding_status", {}).get("nda_signed") == OnboardingStepStatus.COMPLETED.value:
         # Already signed via webhook
         state["documents_signed"].append(DocumentType.NDA.value)
+        state["nda_signed"] = True
         state["current_step"] = "nda_quiz"
+        _record_history(state, "nda_signed", "completed")
         logger.info(f"✅ NDA signed - proceeding to quiz")
         return state
     else:
@@ -563,136 +917,69 @@ async def check_nda_signed_node(state: OnboardingState) -> OnboardingState:
     return state
 
 async def nda_quiz_node(state: OnboardingState) -> OnboardingState:
-    """Handle NDA quiz - only after NDA is signed"""
-    # Check if NDA is signed first
+    """Handle NDA quiz - check if completed or wait"""
+    state.pop("history", None)
     employee = get_employee_by_id(state["employee_id"])
-    if not employee:
-        state["errors"].append("Employee not found")
+
+    # The graph only reaches this node after check_nda_signed_node confirmed
+    # the signature, so the quiz status is the only thing to check
+    if employee and employee.get("onboarding_status", {}).get("nda_quiz_passed") == OnboardingStepStatus.COMPLETED.value:
+        # Already passed via webhook
+        state["quizzes_passed"].append(QuizType.NDA_QUIZ.value)
+        state.setdefault("quiz_passes", {})[QuizType.NDA_QUIZ.value] = True
+        state["current_step"] = "send_dev_guidelines"
+        _record_history(state, "nda_quiz", "passed")
+        logger.info(f"✅ NDA quiz already passed - proceeding")
         return state
-    
-    status = employee.get("onboarding_status", {})
-    
-    # Verify NDA is signed before allowing quiz
-    if status.get("nda_signed") != OnboardingStepStatus.COMPLETED.value:
-        logger.warning(f"❌ Cannot complete NDA quiz - NDA not signed yet for {state['employee_id']}")
-        state["errors"].append("NDA must be signed before taking quiz")
-        # Don't mark quiz as passed - wait for NDA signature
-        state["current_step"] = "waiting_nda_quiz"
-        
-        # Interrupt and wait for NDA to be signed first
-        interrupt({
-            "message": "⏳ NDA must be signed before quiz can be completed",
-            "employee_id": state["employee_id"],
-            "waiting_for": "nda_signature",
-            "current_status": status
-        })
-        
-        # After interrupt resumes, check again
-        employee = get_employee_by_id(state["employee_id"])
-        if employee and employee.get("onboarding_status", {}).get("nda_signed") == OnboardingStepStatus.COMPLETED.value:
-            # Now NDA is signed, check quiz status
-            if employee.get("onboarding_status", {}).get("nda_quiz_passed") == OnboardingStepStatus.COMPLETED.value:
-                # Quiz was completed via webhook
-                state["quizzes_passed"].append(QuizType.NDA_QUIZ.value)
-                state["current_step"] = "send_dev_guidelines"
-                logger.info(f"✅ NDA quiz completed - proceeding to dev guidelines")
-            else:
-                # Still waiting for quiz
-                state["current_step"] = "waiting_nda_quiz"
-                logger.info(f"⏳ Waiting for NDA quiz completion")
-                interrupt({
-                    "message": "⏳ Waiting for NDA quiz to be completed",
-                    "employee_id": state["employee_id"],
-                    "waiting_for": "nda_quiz"
-                })
-        else:
-            # Still not signed
-            logger.warning(f"❌ NDA still not signed after resume")
-            state["errors"].append("NDA signature required")
-    else:
-        # NDA is signed, check if quiz already passed
-        if status.get("nda_quiz_passed") == OnboardingStepStatus.COMPLETED.value:
-            # Already passed via webhook
-            state["quizzes_passed"].append(QuizType.NDA_QUIZ.value)
-            state["current_step"] = "send_dev_guidelines"
-            logger.info(f"✅ NDA quiz already passed - proceeding")
-        else:
-            # NDA signed but quiz not passed - wait for quiz
-            state["current_step"] = "waiting_nda_quiz"
-            logger.info(f"⏳ Waiting for NDA quiz completion")
-            
-            interrupt({
-                "message": "⏳ Waiting for NDA quiz to be completed",
-                "employee_id": state["employee_id"],
-                "waiting_for": "nda_quiz"
-            })
-            
-            # After interrupt resumes, check if quiz passed
-            employee = get_employee_by_id(state["employee_id"])
-            if employee and employee.get("onboarding_status", {}).get("nda_quiz_passed") == OnboardingStepStatus.COMPLETED.value:
-                state["quizzes_passed"].append(QuizType.NDA_QUIZ.value)
-                state["current_step"] = "send_dev_guidelines"
-                logger.info(f"✅ NDA quiz passed - proceeding to dev guidelines")
-                
-                await update_employee_step_status(
-                    state["employee_id"], 
-                    "nda_quiz_passed", 
-                    OnboardingStepStatus.COMPLETED
-                )
-    
+
+    # Not passed yet - INTERRUPT and wait for webhook
+    logger.info(f"⏳ Waiting for NDA quiz completion - INTERRUPTING workflow")
+    interrupt({
+        "status": "waiting_for_quiz",
+        "quiz_type": "nda_quiz",
+        "employee_id": state["employee_id"],
+        "message": "Waiting for quiz completion via webhook"
+    })
+
+    # After interrupt resumes, check again
+    employee = get_employee_by_id(state["employee_id"])
+    if employee and employee.get("onboarding_status", {}).get("nda_quiz_passed") == OnboardingStepStatus.COMPLETED.value:
+        state["quizzes_passed"].append(QuizType.NDA_QUIZ.value)
+        state.setdefault("quiz_passes", {})[QuizType.NDA_QUIZ.value] = True
+        state["current_step"] = "send_dev_guidelines"
+        _record_history(state, "nda_quiz", "passed")
+        logger.info(f"✅ NDA quiz passed after resume - proceeding to dev guidelines")
+        return state
+
+    # Still not passed
+    state["errors"].append("Quiz not passed after resume")
     return state
 
 async def send_dev_guidelines_node(state: OnboardingState) -> OnboardingState:
     """Send dev guidelines - ONLY after NDA completed"""
-    employee_data = state["employee_data"]
-    
-    # Verify NDA is complete first
-    employee = get_employee_by_id(state["employee_id"])
-    if not employee:
-        state["errors"].append("Employee not found")
-        return state
-        
-    status = employee.get("onboarding_status", {})
-    if (status.get("nda_signed") != OnboardingStepStatus.COMPLETED.value or 
-        status.get("nda_quiz_passed") != OnboardingStepStatus.COMPLETED.value):
+    state.pop("history", None)
+
+    # Verify NDA is complete first - both steps were confirmed by the graph
+    # and recorded in state, so no DB re-read is needed
+    if not (state.get("nda_signed") and
+            state.get("quiz_passes", {}).get(QuizType.NDA_QUIZ.value)):
         logger.warning(f"❌ Cannot send dev guidelines - NDA not complete")
         state["errors"].append("NDA must be completed first")
         return state
-    
-    try:
-        # Send real document via doc-esign
-        result = await doc_esign_service.send_document(
-            employee_data["email"], 
-            DocumentType.DEV_GUIDELINES.value,
-            state["employee_id"]
-        )
-        state["documents_sent"].append(DocumentType.DEV_GUIDELINES.value)
-        state["current_step"] = "wait_dev_guidelines_signature"
-        
-        # Email already sent by doc-esign service with signing link
-        # No need for duplicate email here
-        
-        await update_employee_step_status(
-            state["employee_id"], 
-            "dev_guidelines_sent", 
-            OnboardingStepStatus.COMPLETED
-        )
-        logger.info(f"Dev guidelines sent to {employee_data['email']}")
-        
-    except Exception as e:
-        state["errors"].append(f"Failed to send dev guidelines: {str(e)}")
-        logger.error(f"Error sending dev guidelines: {e}")
-    
-    return state
+
+    return await _send_document_step(state, _DEV_GUIDELINES_STEP)
 
 async def check_dev_guidelines_signed_node(state: OnboardingState) -> OnboardingState:
     """Check if dev guidelines is signed - WAIT FOR REAL SIGNATURE"""
+    state.pop("history", None)
     # Check actual status from database
     employee = get_employee_by_id(state["employee_id"])
     if employee and employee.get("onboarding_status", {}).get("dev_guidelines_signed") == OnboardingStepStatus.COMPLETED.value:
         # Already signed via webhook
         state["documents_signed"].append(DocumentType.DEV_GUIDELINES.value)
+        state["dev_guidelines_signed"] = True
         state["current_step"] = "dev_guidelines_quiz"
+        _record_history(state, "dev_guidelines_signed", "completed")
         logger.info(f"✅ Dev guidelines signed - proceeding to quiz")
         return state
     else:
@@ -709,81 +996,61 @@ async def check_dev_guidelines_signed_node(state: OnboardingState) -> Onboarding
     return state
 
 async def dev_guidelines_quiz_node(state: OnboardingState) -> OnboardingState:
-    """Handle dev guidelines quiz - only after guidelines are signed"""
-    # Check if dev guidelines are signed first
+    """Handle dev guidelines quiz - check if completed or wait"""
+    state.pop("history", None)
     employee = get_employee_by_id(state["employee_id"])
-    if not employee:
-        state["errors"].append("Employee not found")
+
+    # The graph only reaches this node after check_dev_guidelines_signed_node
+    # confirmed the signature, so the quiz status is the only thing to check
+    if employee and employee.get("onboarding_status", {}).get("dev_guidelines_quiz_passed") == OnboardingStepStatus.COMPLETED.value:
+        # Already passed via webhook
+        state["quizzes_passed"].append(QuizType.DEV_GUIDELINES_QUIZ.value)
+        state.setdefault("quiz_passes", {})[QuizType.DEV_GUIDELINES_QUIZ.value] = True
+        state["current_step"] = "final_tasks"
+        _record_history(state, "dev_guidelines_quiz", "passed")
+        logger.info(f"✅ Dev guidelines quiz already passed - proceeding to final tasks")
         return state
-    
-    status = employee.get("onboarding_status", {})
-    
-    logger.info(f"📝 CHECKING DEV GUIDELINES QUIZ STATUS for {employee['email']}")
-    logger.info(f"   Dev guidelines signed: {status.get('dev_guidelines_signed')}")
-    logger.info(f"   Dev quiz passed: {status.get('dev_guidelines_quiz_passed')}")
-    
-    # Verify dev guidelines are signed before allowing quiz
-    if status.get("dev_guidelines_signed") != OnboardingStepStatus.COMPLETED.value:
-        logger.warning(f"❌ Cannot complete dev guidelines quiz - guidelines not signed yet for {state['employee_id']}")
-        state["errors"].append("Dev guidelines must be signed before taking quiz")
-        state["current_step"] = "waiting_dev_quiz"
-        
-        interrupt({
-            "message": "⏳ Dev guidelines must be signed before quiz",
-            "employee_id": state["employee_id"],
-            "waiting_for": "dev_guidelines_signature"
-        })
-        
-        # After interrupt resumes, check again
-        employee = get_employee_by_id(state["employee_id"])
-        if employee and employee.get("onboarding_status", {}).get("dev_guidelines_signed") == OnboardingStepStatus.COMPLETED.value:
-            # Guidelines signed, check quiz
-            if employee.get("onboarding_status", {}).get("dev_guidelines_quiz_passed") == OnboardingStepStatus.COMPLETED.value:
-                state["quizzes_passed"].append(QuizType.DEV_GUIDELINES_QUIZ.value)
-                state["current_step"] = "final_tasks"
-                logger.info(f"✅ Dev guidelines quiz completed - proceeding to final tasks")
-            else:
-                state["current_step"] = "waiting_dev_quiz"
-                logger.info(f"⏳ Waiting for dev guidelines quiz")
-                interrupt({
-                    "message": "⏳ Waiting for dev guidelines quiz",
-                    "employee_id": state["employee_id"],
-                    "waiting_for": "dev_guidelines_quiz"
-                })
-    else:
-        # Guidelines signed, check if quiz already passed
-        if status.get("dev_guidelines_quiz_passed") == OnboardingStepStatus.COMPLETED.value:
-            state["quizzes_passed"].append(QuizType.DEV_GUIDELINES_QUIZ.value)
-            state["current_step"] = "final_tasks"
-            logger.info(f"✅ Dev guidelines quiz already passed - proceeding to final tasks")
-        else:
-            # Wait for quiz
-            state["current_step"] = "waiting_dev_quiz"
-            logger.info(f"⏳ Waiting for dev guidelines quiz completion")
-            
-            interrupt({
-                "message": "⏳ Waiting for dev guidelines quiz",
-                "employee_id": state["employee_id"],
-                "waiting_for": "dev_guidelines_quiz"
-            })
-            
-            # After interrupt resumes, check if quiz passed
-            employee = get_employee_by_id(state["employee_id"])
-            if employee and employee.get("onboarding_status", {}).get("dev_guidelines_quiz_passed") == OnboardingStepStatus.COMPLETED.value:
-                state["quizzes_passed"].append(QuizType.DEV_GUIDELINES_QUIZ.value)
-                state["current_step"] = "final_tasks"
-                logger.info(f"✅ Dev guidelines quiz passed - proceeding to final tasks")
-                
-                await update_employee_step_status(
-                    state["employee_id"], 
-                    "dev_guidelines_quiz_passed", 
-                    OnboardingStepStatus.COMPLETED
-                )
-    
+
+    # Not passed yet - INTERRUPT and wait for webhook
+    logger.info(f"⏳ Waiting for dev guidelines quiz completion - INTERRUPTING workflow")
+    interrupt({
+        "status": "waiting_for_quiz",
+        "quiz_type": "dev_guidelines_quiz",
+        "employee_id": state["employee_id"],
+        "message": "Waiting for quiz completion via webhook"
+    })
+
+    # After interrupt resumes, check again
+    employee = get_employee_by_id(state["employee_id"])
+    if employee and employee.get("onboarding_status", {}).get("dev_guidelines_quiz_passed") == OnboardingStepStatus.COMPLETED.value:
+        state["quizzes_passed"].append(QuizType.DEV_GUIDELINES_QUIZ.value)
+        state.setdefault("quiz_passes", {})[QuizType.DEV_GUIDELINES_QUIZ.value] = True
+        state["current_step"] = "final_tasks"
+        _record_history(state, "dev_guidelines_quiz", "passed")
+        logger.info(f"✅ Dev guidelines quiz passed after resume - proceeding to final tasks")
+        return state
+
+    # Still not passed
+    state["errors"].append("Quiz not passed after resume")
     return state
 
+# Prerequisites for the final tasks, as (step field, display name) pairs
+# and the corresponding completion bits pre-ORed into one required mask
+_FINAL_PREREQ_STEPS = (
+    ("company_policy_signed", "Company Policy"),
+    ("company_policy_quiz_passed", "Company Policy Quiz"),
+    ("nda_signed", "NDA"),
+    ("nda_quiz_passed", "NDA Quiz"),
+    ("dev_guidelines_signed", "Dev Guidelines"),
+    ("dev_guidelines_quiz_passed", "Dev Guidelines Quiz"),
+)
+_FINAL_PREREQ_MASK = 0
+for _step_key, _ in _FINAL_PREREQ_STEPS:
+    _FINAL_PREREQ_MASK |= OnboardingStatus.STEP_BITS[_step_key]
+
 async def final_tasks_node(state: OnboardingState) -> OnboardingState:
     """Execute final onboarding tasks - ONLY after ALL documents signed and quizzes passed"""
+    state.pop("history", None)
     employee_data = state["employee_data"]
     
     # VERIFY ALL PREREQUISITES ARE MET
@@ -793,22 +1060,19 @@ async def final_tasks_node(state: OnboardingState) -> OnboardingState:
         return state
     
     status = employee.get("onboarding_status", {})
-    
-    # Check ALL prerequisites
-    required_steps = [
-        ("company_policy_signed", "Company Policy"),
-        ("company_policy_quiz_passed", "Company Policy Quiz"),
-        ("nda_signed", "NDA"),
-        ("nda_quiz_passed", "NDA Quiz"),
-        ("dev_guidelines_signed", "Dev Guidelines"),
-        ("dev_guidelines_quiz_passed", "Dev Guidelines Quiz")
-    ]
-    
-    incomplete_steps = []
-    for step_key, step_name in required_steps:
-        if status.get(step_key) != OnboardingStepStatus.COMPLETED.value:
-            incomplete_steps.append(step_name)
-    
+
+    # Check ALL prerequisites - one machine-word AND against the progress
+    # bitmask instead of six dict lookups and string comparisons
+    progress_mask = status.get('progress_mask')
+    if progress_mask is None:
+        progress_mask = OnboardingStatus.compute_progress_mask(status)
+    missing_bits = _FINAL_PREREQ_MASK & ~progress_mask
+
+    incomplete_steps = [
+        step_name for step_key, step_name in _FINAL_PREREQ_STEPS
+        if missing_bits & OnboardingStatus.STEP_BITS[step_key]
+    ] if missing_bits else []
+
     if incomplete_steps:
         logger.error(f"❌ CANNOT proceed to final tasks - incomplete: {', '.join(incomplete_steps)}")
         state["errors"].append(f"Prerequisites not met: {', '.join(incomplete_steps)}")
@@ -821,14 +1085,13 @@ async def final_tasks_node(state: OnboardingState) -> OnboardingState:
     
     employee_data = state["employee_data"]
     
-    # All final tasks happen in parallel
-    tasks = []
-    
-    # Slack invite
-    async def send_slack_invite():
-        try:
-            slack_link = os.getenv("SLACK_INVITE_LINK", "https://join.slack.com/t/company/shared_invite/example")
-            body_html = f"""<p>Hi {employee_data['name']},</p>
+    # All final tasks go out as one batched send over the shared client
+    slack_link = os.getenv("SLACK_INVITE_LINK", "https://join.slack.com/t/company/shared_invite/example")
+    jira_url = os.getenv("JIRA_URL", "https://company.atlassian.net")
+    calendly_link = os.getenv("CALENDLY_LINK", "https://calendly.com/vivek-m-agarwal/30min")
+    manager_name = os.getenv("MANAGER_NAME", "Your Manager")
+
+    slack_body = f"""<p>Hi {employee_data['name']},</p>
 <p>Welcome to the team! You've been invited to join our Slack workspace.</p>
 <p><strong>Click here to join:</strong> <a href="{slack_link}">{slack_link}</a></p>
 <p>Slack is our primary communication tool. Once you join:</p>
@@ -839,25 +1102,8 @@ async def final_tasks_node(state: OnboardingState) -> OnboardingState:
 </ul>
 <p>If you have any questions, please reach out to your manager or the IT team.</p>
 <p>Best regards,<br>HR Team</p>"""
-            
-            await email_service.send_email(
-                to_email=employee_data["email"],
-                subject="Join Our Slack Workspace",
-                body=body_html,
-                template_type="slack_invite"
-            )
-            state["final_tasks_status"]["slack"] = True
-            await update_employee_step_status(state["employee_id"], "slack_invite_sent", OnboardingStepStatus.COMPLETED)
-            logger.info(f"✅ Slack invite sent to {employee_data['email']}")
-        except Exception as e:
-            state["errors"].append(f"Slack invite error: {str(e)}")
-            logger.error(f"❌ Failed to send Slack invite: {e}")
-    
-    # Jira access
-    async def grant_jira_access():
-        try:
-            jira_url = os.getenv("JIRA_URL", "https://company.atlassian.net")
-            body_html = f"""<p>Hi {employee_data['name']},</p>
+
+    jira_body = f"""<p>Hi {employee_data['name']},</p>
 <p>Your Jira access has been granted! You can now access our project management system.</p>
 <p><strong>Access Details:</strong></p>
 <ul>
@@ -874,26 +1120,8 @@ async def final_tasks_node(state: OnboardingState) -> OnboardingState:
 </ul>
 <p>For Jira training and best practices, check our internal wiki or contact your team lead.</p>
 <p>Best regards,<br>IT Team</p>"""
-            
-            await email_service.send_email(
-                to_email=employee_data["email"],
-                subject="Jira Access Granted",
-                body=body_html,
-                template_type="jira_access"
-            )
-            state["final_tasks_status"]["jira"] = True
-            await update_employee_step_status(state["employee_id"], "jira_access_granted", OnboardingStepStatus.COMPLETED)
-            logger.info(f"✅ Jira access granted email sent to {employee_data['email']}")
-        except Exception as e:
-            state["errors"].append(f"Jira access error: {str(e)}")
-            logger.error(f"❌ Failed to send Jira access email: {e}")
-    
-    # Schedule onboarding call
-    async def schedule_call():
-        try:
-            calendly_link = os.getenv("CALENDLY_LINK", "https://calendly.com/vivek-m-agarwal/30min")
-            manager_name = os.getenv("MANAGER_NAME", "Your Manager")
-            body_html = f"""<p>Hi {employee_data['name']},</p>
+
+    call_body = f"""<p>Hi {employee_data['name']},</p>
 <p>Congratulations on completing your onboarding documentation!</p>
 <p>The final step is to schedule your onboarding call with {manager_name}. During this call, we'll:</p>
 <ul>
@@ -907,80 +1135,336 @@ async def final_tasks_node(state: OnboardingState) -> OnboardingState:
 <p>The call typically takes 30 minutes. Please come prepared with any questions about your role, the team, or the company.</p>
 <p>We're looking forward to speaking with you!</p>
 <p>Best regards,<br>HR Team</p>"""
-            
-            await email_service.send_email(
-                to_email=employee_data["email"],
-                subject="Schedule Your Onboarding Call",
-                body=body_html,
-                template_type="meeting_scheduled"
-            )
-            state["final_tasks_status"]["call"] = True
-            await update_employee_step_status(state["employee_id"], "onboarding_call_scheduled", OnboardingStepStatus.COMPLETED)
-            logger.info(f"✅ Onboarding call scheduling email sent to {employee_data['email']}")
-        except Exception as e:
-            state["errors"].append(f"Call scheduling error: {str(e)}")
-            logger.error(f"❌ Failed to send call scheduling email: {e}")
-    
-    # Execute all tasks in parallel
-    await asyncio.gather(send_slack_invite(), grant_jira_access(), schedule_call())
-    
+
+    final_tasks = [
+        ("slack", "slack_invite_sent", "Slack invite",
+         {"to_email": employee_data["email"], "subject": "Join Our Slack Workspace",
+          "body": slack_body, "template_type": "slack_invite"}),
+        ("jira", "jira_access_granted", "Jira access",
+         {"to_email": employee_data["email"], "subject": "Jira Access Granted",
+          "body": jira_body, "template_type": "jira_access"}),
+        ("call", "onboarding_call_scheduled", "Onboarding call",
+         {"to_email": employee_data["email"], "subject": "Schedule Your Onboarding Call",
+          "body": call_body, "template_type": "meeting_scheduled"}),
+    ]
+
+    results = await email_service.send_batch([spec[3] for spec in final_tasks])
+    status_updates: Dict[str, Any] = {}
+    for (flag, step_key, label, _), result in zip(final_tasks, results):
+        # send_email catches its own exceptions and reports them as a
+        # failed-status dict, so check both failure shapes before marking
+        # the task done
+        if isinstance(result, Exception) or result.get("status") == "failed":
+            error = result if isinstance(result, Exception) else result.get("error", "send failed")
+            state["errors"].append(f"{label} error: {error}")
+            logger.error(f"❌ Failed to send {label} email: {error}")
+            continue
+        state["final_tasks_status"][flag] = True
+        status_updates[step_key] = OnboardingStepStatus.COMPLETED.value
+        logger.info(f"✅ {label} email sent to {employee_data['email']}")
+
+    # One coalesced write covering all task statuses plus completion time,
+    # instead of one full-file rewrite per task. Onboarding is only
+    # stamped complete when every final task actually went out.
+    if len(status_updates) == len(final_tasks):
+        status_updates['completed_at'] = datetime.now().isoformat()
+    if status_updates:
+        await update_employee_step_status_bulk(state["employee_id"], status_updates)
+
     state["current_step"] = "completed"
-    
-    # Mark onboarding as completed
-    result = employees_table.search(EmployeeQuery.id == state["employee_id"])
-    if result:
-        emp_data = result[0].copy()
-        doc_id = result[0].doc_id
-        emp_data['onboarding_status']['completed_at'] = datetime.now().isoformat()
-        employees_table.update(emp_data, doc_ids=[doc_id])
-    
+    _record_history(state, "final_tasks", "completed")
+
     return state
 
 # Helper function to get employee by ID
 def get_employee_by_id(employee_id: str) -> dict:
     """Get employee from database by ID"""
-    result = employees_table.search(EmployeeQuery.id == employee_id)
-    if result:
-        return result[0]
-    return None
+    return employee_index.get_by_id(employee_id)
 
 # Helper function to log email activity
 async def log_email_activity(employee_id: str, action: str, details: dict):
     """Log email activity for audit trail"""
-    result = employees_table.search(EmployeeQuery.id == employee_id)
-    if result:
-        doc_id = result[0].doc_id
-        emp_data = result[0]
-        
-        # Add to email logs
-        if "email_logs" not in emp_data:
-            emp_data["email_logs"] = []
-        
-        emp_data["email_logs"].append({
-            "action": action,
-            "details": details,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        employees_table.update(emp_data, doc_ids=[doc_id])
-        logger.info(f"\ud83d\udce7 Email activity logged: {action} for employee {employee_id}")
+    email_logs_table.insert({
+        "employee_id": employee_id,
+        "action": action,
+        "details": details,
+        "timestamp": datetime.now().isoformat()
+    })
+    await flush_db_async()
+    logger.info(f"\ud83d\udce7 Email activity logged: {action} for employee {employee_id}")
+
+# Query ASTs are rebuilt on every `Query().field == value` expression;
+# memoize the per-employee predicate since log reads repeat the same ids
+@lru_cache(maxsize=1024)
+def _email_logs_query(employee_id: str):
+    return EmployeeQuery.employee_id == employee_id
+
+def get_email_logs(employee_id: str) -> List[Dict[str, Any]]:
+    """Fetch email log entries for one employee"""
+    return email_logs_table.search(_email_logs_query(employee_id))
 
 # Helper function to update employee status
-async def update_employee_step_status(employee_id: str, step: str, status: OnboardingStepStatus):
+async def update_employee_step_status(employee_id: str, step: str, status: OnboardingStepStatus,
+                                      now_iso: Optional[str] = None):
     """Update specific step status for employee"""
-    result = employees_table.search(EmployeeQuery.id == employee_id)
-    if result:
-        emp_data = result[0].copy()
-        doc_id = result[0].doc_id
+    doc = employee_index.get_by_id(employee_id)
+    if doc is not None:
+        # No copy: TinyDB hands back a fresh top-level Document per lookup,
+        # and the whole document is written straight back by doc_id below
+        emp_data = doc
+        doc_id = doc.doc_id
         
         if 'onboarding_status' not in emp_data:
             emp_data['onboarding_status'] = {}
-        
-        emp_data['onboarding_status'][step] = status.value
-        emp_data['onboarding_status']['last_updated'] = datetime.now().isoformat()
-        emp_data['updated_at'] = datetime.now().isoformat()
-        
+
+        status_data = emp_data['onboarding_status']
+
+        # Keep the completed-step bitmask in sync on transitions
+        if 'progress_mask' not in status_data:
+            status_data['progress_mask'] = OnboardingStatus.compute_progress_mask(status_data)
+        old_mask = status_data['progress_mask']
+        bit = OnboardingStatus.STEP_BITS.get(step)
+        if bit is not None:
+            if status == OnboardingStepStatus.COMPLETED:
+                status_data['progress_mask'] |= bit
+            else:
+                status_data['progress_mask'] &= ~bit
+        _progress_hist_move(old_mask, status_data['progress_mask'])
+
+        status_data[step] = status.value
+        if now_iso is None:
+            now_iso = datetime.now().isoformat()
+        status_data['last_updated'] = now_iso
+        status_data['last_updated_ns'] = time.time_ns()
+        emp_data['updated_at'] = now_iso
+
         employees_table.update(emp_data, doc_ids=[doc_id])
+        _invalidate_stats_cache()
+        await flush_db_async()
+
+async def update_employee_step_status_bulk(employee_id: str, updates: Dict[str, Any],
+                                           now_iso: Optional[str] = None):
+    """Apply several onboarding_status fields in a single table write.
+
+    One search, one merge, one update - instead of a full read-modify-write
+    (and whole-file rewrite) per field.
+    """
+    doc = employee_index.get_by_id(employee_id)
+    if doc is not None:
+        # No copy: TinyDB hands back a fresh top-level Document per lookup,
+        # and the whole document is written straight back by doc_id below
+        emp_data = doc
+        doc_id = doc.doc_id
+
+        if 'onboarding_status' not in emp_data:
+            emp_data['onboarding_status'] = {}
+
+        status_data = emp_data['onboarding_status']
+
+        if 'progress_mask' not in status_data:
+            status_data['progress_mask'] = OnboardingStatus.compute_progress_mask(status_data)
+        old_mask = status_data['progress_mask']
+        for key, value in updates.items():
+            bit = OnboardingStatus.STEP_BITS.get(key)
+            if bit is not None:
+                if value == OnboardingStepStatus.COMPLETED.value:
+                    status_data['progress_mask'] |= bit
+                else:
+                    status_data['progress_mask'] &= ~bit
+            status_data[key] = value
+        _progress_hist_move(old_mask, status_data['progress_mask'])
+
+        if now_iso is None:
+            now_iso = datetime.now().isoformat()
+        status_data['last_updated'] = now_iso
+        status_data['last_updated_ns'] = time.time_ns()
+        emp_data['updated_at'] = now_iso
+
+        employees_table.update(emp_data, doc_ids=[doc_id])
+        _invalidate_stats_cache()
+        await flush_db_async()
+
+# Fire-and-forget write queue: nodes enqueue non-critical status updates
+# instead of awaiting a full read-modify-write on their critical path. A
+# single consumer drains the queue, coalescing updates that arrive within
+# a short window into one write per employee. Completion-critical writes
+# (the final-tasks bulk update) stay synchronous.
+_write_queue: "asyncio.Queue[tuple]" = asyncio.Queue()
+
+def queue_step_status(employee_id: str, step: str, status: OnboardingStepStatus):
+    """Enqueue a step-status update for the background writer"""
+    _write_queue.put_nowait((employee_id, step, status.value))
+
+async def _db_writer_loop():
+    """Single-writer consumer that batches queued status updates"""
+    while True:
+        employee_id, step, value = await _write_queue.get()
+        batch: Dict[str, Dict[str, Any]] = {employee_id: {step: value}}
+        # Coalesce whatever else arrives within the window (max 32 per flush)
+        try:
+            while sum(len(u) for u in batch.values()) < 32:
+                employee_id, step, value = await asyncio.wait_for(_write_queue.get(), 0.05)
+                batch.setdefault(employee_id, {})[step] = value
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # Shutdown landed mid-window: the batch in hand was already
+            # dequeued, so write it before propagating the cancellation
+            await _flush_status_batch(batch)
+            raise
+        await _flush_status_batch(batch)
+
+async def _flush_status_batch(batch: Dict[str, Dict[str, Any]]):
+    """Write one coalesced batch, one timestamp for the whole flush"""
+    now_iso = datetime.now().isoformat()
+    for eid, updates in batch.items():
+        try:
+            await update_employee_step_status_bulk(eid, updates, now_iso=now_iso)
+        except Exception as e:
+            logger.error(f"Queued status write failed for {eid}: {e}")
+
+async def _drain_write_queue():
+    """Apply any still-queued updates (shutdown path)"""
+    while not _write_queue.empty():
+        employee_id, step, value = _write_queue.get_nowait()
+        await update_employee_step_status_bulk(employee_id, {step: value})
+
+class DeferredMemorySaver(MemorySaver):
+    """MemorySaver that batches checkpoint writes per thread.
+
+    MemorySaver persists a full checkpoint after every super-step; for the
+    ~10-node onboarding graph that is a dozen serializations of the whole
+    workflow state per run. This saver buffers put()/put_writes() calls per
+    thread and replays them into the underlying store only when the thread
+    is read back (resume after an interrupt, state inspection), so a
+    straight run costs one flush instead of one serialization per node.
+    Set CHECKPOINT_MODE=per_node to restore write-through checkpointing
+    for debugging.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._pending: Dict[str, List[tuple]] = {}
+        self._deferred = os.getenv("CHECKPOINT_MODE", "end_of_workflow") != "per_node"
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        if not self._deferred:
+            return super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        self._pending.setdefault(thread_id, []).append(
+            ("put", (config, checkpoint, metadata, new_versions))
+        )
+        # Mirror the config MemorySaver.put would return
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": config["configurable"].get("checkpoint_ns", ""),
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        if not self._deferred:
+            return super().put_writes(config, writes, task_id, task_path)
+        thread_id = config["configurable"]["thread_id"]
+        self._pending.setdefault(thread_id, []).append(
+            ("put_writes", (config, writes, task_id, task_path))
+        )
+
+    def flush(self, thread_id: str):
+        """Replay buffered checkpoint writes for a thread into the store"""
+        for method, args in self._pending.pop(thread_id, []):
+            if method == "put":
+                super().put(*args)
+            else:
+                super().put_writes(*args)
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"].get("thread_id")
+        if thread_id:
+            self.flush(thread_id)
+        return super().get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        if config and config["configurable"].get("thread_id"):
+            self.flush(config["configurable"]["thread_id"])
+        return super().list(config, filter=filter, before=before, limit=limit)
+
+class SwappableCheckpointer(BaseCheckpointSaver):
+    """Delegating checkpointer whose backend is chosen at startup.
+
+    The graph is compiled once at module import, before any event loop
+    exists, but the SQLite saver needs a running loop to open its
+    aiosqlite connection - so the graph is compiled against this proxy
+    and the real backend is swapped in during lifespan startup.
+    """
+
+    def __init__(self, backend):
+        super().__init__()
+        self.swap(backend)
+
+    def swap(self, backend):
+        self.backend = backend
+        self.serde = backend.serde
+
+    def get_tuple(self, config):
+        return self.backend.get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        return self.backend.list(config, filter=filter, before=before, limit=limit)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        return self.backend.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        return self.backend.put_writes(config, writes, task_id, task_path)
+
+    async def aget_tuple(self, config):
+        return await self.backend.aget_tuple(config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        async for item in self.backend.alist(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await self.backend.aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await self.backend.aput_writes(config, writes, task_id, task_path)
+
+    def get_next_version(self, current, channel):
+        return self.backend.get_next_version(current, channel)
+
+# Checkpointer for workflow persistence - module-level singleton so admin
+# endpoints can reach it and so the compiled graph is built exactly once.
+# Starts on the in-memory saver; lifespan swaps in the SQLite backend
+# when langgraph-checkpoint-sqlite is available
+workflow_checkpointer = SwappableCheckpointer(DeferredMemorySaver())
+
+async def _init_checkpoint_backend():
+    """Open the SQLite checkpoint store and swap it in, if possible.
+
+    Persisting checkpoints means a resume loads only its thread's rows
+    via an indexed lookup, and in-flight onboardings survive a process
+    restart. Returns the connection (for shutdown) or None when staying
+    on the in-memory saver.
+    """
+    if os.getenv("CHECKPOINT_BACKEND", "sqlite") != "sqlite":
+        return None
+    try:
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    except ImportError:
+        logger.info("langgraph-checkpoint-sqlite not installed; keeping in-memory checkpointer")
+        return None
+
+    checkpoint_path = os.getenv("CHECKPOINT_DB_PATH", str(Path(db_path).parent / "checkpoints.db"))
+    conn = await aiosqlite.connect(checkpoint_path)
+    saver = AsyncSqliteSaver(conn)
+    await saver.setup()
+    workflow_checkpointer.swap(saver)
+    logger.info(f"Workflow checkpoints persisted to {checkpoint_path}")
+    return conn
 
 # Build the workflow graph
 def build_workflow():
@@ -1022,20 +1506,41 @@ def build_workflow():
     # Set entry point
     workflow.set_entry_point("send_company_policy")
     
-    # Create checkpointer for persistence
-    checkpointer = MemorySaver()
-    
-    # Compile the workflow
-    return workflow.compile(checkpointer=checkpointer)
+    # Compile the workflow with the shared checkpointer
+    return workflow.compile(checkpointer=workflow_checkpointer)
 
-# Initialize the workflow
+# Initialize the workflow once at module import - StateGraph.compile walks
+# and validates the whole graph, so it must not run per employee
 onboarding_workflow = build_workflow()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan - start the DB writer, close clients on shutdown"""
+    checkpoint_conn = await _init_checkpoint_backend()
+    writer_task = asyncio.create_task(_db_writer_loop())
+    yield
+    writer_task.cancel()
+    # Await the cancelled consumer so a batch dequeued mid-window is
+    # flushed before the leftover queue is drained
+    with suppress(asyncio.CancelledError):
+        await writer_task
+    await _drain_write_queue()
+    if checkpoint_conn is not None:
+        await checkpoint_conn.close()
+    _parse_pool.shutdown(wait=False)
+    await smtp_email_service.close()
+    await doc_esign_service.client.aclose()
+    await email_service.http_client.aclose()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="HRMS AI-Powered Onboarding System",
     description="Automated employee onboarding with LangGraph orchestration",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson serializes responses (incl. datetimes) several times faster
+    # than the stdlib json encoder
+    default_response_class=ORJSONResponse
 )
 
 # CORS configuration - allow all origins for MVP
@@ -1094,6 +1599,17 @@ async def api_info():
 # Store workflow threads
 workflow_threads = {}
 
+# Per-thread LangGraph config dicts, built once and reused across resumes
+_thread_configs: Dict[str, Dict[str, Any]] = {}
+
+def _config_for_thread(thread_id: str) -> Dict[str, Any]:
+    """Return the cached config dict for a workflow thread"""
+    config = _thread_configs.get(thread_id)
+    if config is None:
+        config = {"configurable": {"thread_id": thread_id}}
+        _thread_configs[thread_id] = config
+    return config
+
 def restore_workflow_threads():
     """Restore workflow thread mappings from database on server startup"""
     try:
@@ -1118,8 +1634,33 @@ def restore_workflow_threads():
 # Restore threads on startup
 restore_workflow_threads()
 
+# Single-flight resume guards: duplicate webhook deliveries (or signature
+# and quiz events landing together) must not execute the graph twice
+# concurrently for one employee
+_resume_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+_resume_dirty: set = set()
+
 async def resume_workflow_if_needed(employee_id: str, trigger_event: str):
-    """Resume interrupted workflow when external event occurs"""
+    """Resume interrupted workflow when external event occurs.
+
+    Concurrent calls for the same employee coalesce: while one resume is
+    executing, later events just mark the employee dirty and the running
+    call re-resumes once after it finishes.
+    """
+    lock = _resume_locks[employee_id]
+    if lock.locked():
+        _resume_dirty.add(employee_id)
+        logger.info(f"🔁 Resume already in flight for {employee_id}; queued re-run after {trigger_event}")
+        return
+    async with lock:
+        while True:
+            _resume_dirty.discard(employee_id)
+            await _do_resume(employee_id, trigger_event)
+            if employee_id not in _resume_dirty:
+                break
+
+async def _do_resume(employee_id: str, trigger_event: str):
+    """Execute one resume attempt (callers hold the per-employee lock)"""
     try:
         thread_id = workflow_threads.get(employee_id)
         if not thread_id:
@@ -1135,7 +1676,7 @@ async def resume_workflow_if_needed(employee_id: str, trigger_event: str):
             return
             
         # Resume workflow with current state
-        config = {"configurable": {"thread_id": thread_id}}
+        config = _config_for_thread(thread_id)
         
         try:
             # CRITICAL FIX: Use Command(resume=None) to resume from interrupt point
@@ -1163,6 +1704,44 @@ async def resume_workflow_if_needed(employee_id: str, trigger_event: str):
         logger.error(f"Error resuming workflow: {e}")
         # Continue anyway - don't block webhook processing
 
+# Past this roster size the parse loop is offloaded to a thread pool so
+# CPU-bound datetime parsing and model validation don't block the event
+# loop while webhooks are in flight; below it the thread-hop costs more
+# than it saves
+_PARALLEL_PARSE_THRESHOLD = 200
+_parse_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="emp-parse")
+
+# Date keys parsed by _parse_employee_doc, hoisted so the per-row loop
+# iterates prebuilt tuples
+_EMPLOYEE_DATE_KEYS = ('created_at', 'updated_at')
+_STATUS_DATE_KEYS = ('last_updated', 'started_at', 'completed_at')
+
+def _parse_employee_doc(emp_doc: Dict[str, Any],
+                        email_logs: Optional[List[Dict[str, Any]]] = None) -> Employee:
+    """Convert a stored employee document into an Employee model in one pass.
+
+    Date parsing, status-model construction and email-log merging happen in
+    a single traversal; copies are shallow and taken only where the nested
+    dict is shared with the storage cache.
+    """
+    emp_data = emp_doc.copy()
+    for key in _EMPLOYEE_DATE_KEYS:
+        value = emp_data.get(key)
+        if isinstance(value, str):
+            emp_data[key] = datetime.fromisoformat(value)
+    if 'onboarding_status' in emp_data:
+        # Copy before parsing: with CachingMiddleware the nested dict is
+        # shared with the storage cache and must not be mutated in place
+        status_data = emp_data['onboarding_status'].copy()
+        for key in _STATUS_DATE_KEYS:
+            value = status_data.get(key)
+            if isinstance(value, str):
+                status_data[key] = datetime.fromisoformat(value)
+        emp_data['onboarding_status'] = OnboardingStatus(**status_data)
+    # email_logs live in their own table; merge with any legacy embedded entries
+    emp_data['email_logs'] = list(emp_data.get('email_logs', [])) + (email_logs or [])
+    return Employee(**emp_data)
+
 # ============================================
 # Employee Management Endpoints
 # ============================================
@@ -1171,44 +1750,59 @@ async def resume_workflow_if_needed(employee_id: str, trigger_event: str):
 async def get_all_employees():
     """Get all employees with their onboarding status"""
     try:
-        all_employees = employees_table.all()
-        employees = []
-        for emp_doc in all_employees:
-            # Convert document to Employee model
-            emp_data = emp_doc.copy()
-            # Parse datetime strings back to datetime objects
-            if 'created_at' in emp_data and isinstance(emp_data['created_at'], str):
-                emp_data['created_at'] = datetime.fromisoformat(emp_data['created_at'])
-            if 'updated_at' in emp_data and isinstance(emp_data['updated_at'], str):
-                emp_data['updated_at'] = datetime.fromisoformat(emp_data['updated_at'])
-            # Parse nested onboarding status
-            if 'onboarding_status' in emp_data:
-                status_data = emp_data['onboarding_status']
-                if 'last_updated' in status_data and isinstance(status_data['last_updated'], str):
-                    status_data['last_updated'] = datetime.fromisoformat(status_data['last_updated'])
-                if 'started_at' in status_data and isinstance(status_data['started_at'], str):
-                    status_data['started_at'] = datetime.fromisoformat(status_data['started_at'])
-                if 'completed_at' in status_data and isinstance(status_data['completed_at'], str):
-                    status_data['completed_at'] = datetime.fromisoformat(status_data['completed_at'])
-                emp_data['onboarding_status'] = OnboardingStatus(**status_data)
-            
-            employees.append(Employee(**emp_data))
-        
-        # Add progress calculation to each employee
-        for emp in employees:
-            emp.onboarding_status.calculate_progress()
-        
-        return employees
+        # One scan of the logs table grouped by employee, instead of a
+        # per-employee query
+        logs_by_employee: Dict[str, List[Dict[str, Any]]] = {}
+        for log in email_logs_table.all():
+            logs_by_employee.setdefault(log.get('employee_id'), []).append(log)
+        all_docs = employees_table.all()
+        if len(all_docs) >= _PARALLEL_PARSE_THRESHOLD:
+            # Large roster: spread parsing across the pool and keep the
+            # event loop free for concurrent webhooks
+            loop = asyncio.get_running_loop()
+            return list(await asyncio.gather(*(
+                loop.run_in_executor(
+                    _parse_pool, _parse_employee_doc,
+                    emp_doc, logs_by_employee.get(emp_doc.get('id'))
+                )
+                for emp_doc in all_docs
+            )))
+        # Single pass: parse each document straight into its model
+        return [
+            _parse_employee_doc(emp_doc, logs_by_employee.get(emp_doc.get('id')))
+            for emp_doc in all_docs
+        ]
     except Exception as e:
         logger.error(f"Error fetching employees: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/employees/stream")
+async def stream_all_employees():
+    """Stream all employees as newline-delimited JSON.
+
+    Rows are parsed and serialized one at a time, so peak memory stays
+    O(1) per employee and the first row goes out before the rest are
+    parsed - unlike the list endpoint, which materializes the full roster.
+    """
+    # One scan of the logs table grouped by employee, instead of a
+    # per-employee query
+    logs_by_employee: Dict[str, List[Dict[str, Any]]] = {}
+    for log in email_logs_table.all():
+        logs_by_employee.setdefault(log.get('employee_id'), []).append(log)
+
+    async def generate():
+        for emp_doc in employees_table.all():
+            employee = _parse_employee_doc(emp_doc, logs_by_employee.get(emp_doc.get('id')))
+            yield orjson.dumps(employee.model_dump(mode="json")) + b"\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 @app.post("/api/employees", response_model=Employee)
 async def create_employee(employee_data: EmployeeCreate):
     """Create a new employee"""
     try:
         # Check for duplicate email
-        existing = employees_table.search(EmployeeQuery.email == employee_data.email)
+        existing = employee_index.get_by_email(employee_data.email)
         if existing:
             raise HTTPException(status_code=409, detail="Employee with this email already exists")
         
@@ -1221,16 +1815,17 @@ async def create_employee(employee_data: EmployeeCreate):
             start_date=employee_data.start_date
         )
         
-        # Convert to dict for storage
-        emp_dict = new_employee.dict()
-        # Convert datetime objects to strings for JSON serialization
-        emp_dict['created_at'] = emp_dict['created_at'].isoformat()
-        emp_dict['updated_at'] = emp_dict['updated_at'].isoformat()
-        emp_dict['onboarding_status']['last_updated'] = emp_dict['onboarding_status']['last_updated'].isoformat()
+        # Convert to dict for storage; mode="json" renders datetimes as ISO
+        # strings in one C-speed pass instead of per-field isoformat() calls
+        emp_dict = new_employee.model_dump(mode="json")
         
         # Insert into database
         doc_id = employees_table.insert(emp_dict)
-        
+        employee_index.register(emp_dict, doc_id)
+        _progress_hist_add(emp_dict['onboarding_status'].get('progress_mask', 0))
+        _invalidate_stats_cache()
+        await flush_db_async()
+
         logger.info(f"Created new employee: {new_employee.name} ({new_employee.email})")
         
         return new_employee
@@ -1244,30 +1839,11 @@ async def create_employee(employee_data: EmployeeCreate):
 async def get_employee(employee_id: str):
     """Get a specific employee by ID"""
     try:
-        result = employees_table.search(EmployeeQuery.id == employee_id)
-        if not result:
+        doc = employee_index.get_by_id(employee_id)
+        if doc is None:
             raise HTTPException(status_code=404, detail="Employee not found")
-        
-        emp_data = result[0].copy()
-        
-        # Parse datetime strings
-        if 'created_at' in emp_data and isinstance(emp_data['created_at'], str):
-            emp_data['created_at'] = datetime.fromisoformat(emp_data['created_at'])
-        if 'updated_at' in emp_data and isinstance(emp_data['updated_at'], str):
-            emp_data['updated_at'] = datetime.fromisoformat(emp_data['updated_at'])
-        
-        # Parse nested onboarding status
-        if 'onboarding_status' in emp_data:
-            status_data = emp_data['onboarding_status']
-            if 'last_updated' in status_data and isinstance(status_data['last_updated'], str):
-                status_data['last_updated'] = datetime.fromisoformat(status_data['last_updated'])
-            if 'started_at' in status_data and isinstance(status_data['started_at'], str):
-                status_data['started_at'] = datetime.fromisoformat(status_data['started_at'])
-            if 'completed_at' in status_data and isinstance(status_data['completed_at'], str):
-                status_data['completed_at'] = datetime.fromisoformat(status_data['completed_at'])
-            emp_data['onboarding_status'] = OnboardingStatus(**status_data)
-        
-        return Employee(**emp_data)
+
+        return _parse_employee_doc(doc, get_email_logs(employee_id))
     except HTTPException:
         raise
     except Exception as e:
@@ -1281,27 +1857,39 @@ async def update_employee_status(
 ):
     """Update employee onboarding status"""
     try:
-        result = employees_table.search(EmployeeQuery.id == employee_id)
-        if not result:
+        doc = employee_index.get_by_id(employee_id)
+        if doc is None:
             raise HTTPException(status_code=404, detail="Employee not found")
-        
-        emp_data = result[0].copy()
-        doc_id = result[0].doc_id
+
+        emp_data = doc
+        doc_id = doc.doc_id
         
         # Update onboarding status fields
         if 'onboarding_status' not in emp_data:
             emp_data['onboarding_status'] = {}
         
+        old_mask = emp_data['onboarding_status'].get('progress_mask')
+        if old_mask is None:
+            old_mask = OnboardingStatus.compute_progress_mask(emp_data['onboarding_status'])
+
         for key, value in status_update.items():
             if key in emp_data['onboarding_status']:
                 emp_data['onboarding_status'][key] = value
-        
-        emp_data['onboarding_status']['last_updated'] = datetime.now().isoformat()
-        emp_data['updated_at'] = datetime.now().isoformat()
+
+        # Arbitrary fields may have changed - recount rather than track deltas
+        emp_data['onboarding_status']['progress_mask'] = OnboardingStatus.compute_progress_mask(
+            emp_data['onboarding_status']
+        )
+        _progress_hist_move(old_mask, emp_data['onboarding_status']['progress_mask'])
+        now_iso = datetime.now().isoformat()
+        emp_data['onboarding_status']['last_updated'] = now_iso
+        emp_data['updated_at'] = now_iso
         
         # Update in database
         employees_table.update(emp_data, doc_ids=[doc_id])
-        
+        _invalidate_stats_cache()
+        await flush_db_async()
+
         logger.info(f"Updated status for employee {employee_id}")
         
         return {"message": "Status updated successfully", "employee_id": employee_id}
@@ -1316,7 +1904,7 @@ async def update_employee_status(
 # ============================================
 
 @app.post("/api/onboarding/start")
-async def start_onboarding(request: Dict[str, str] = Body(...), background_tasks: BackgroundTasks = None):
+async def start_onboarding(background_tasks: BackgroundTasks, request: Dict[str, str] = Body(...)):
     """Start the onboarding workflow for an employee"""
     employee_id = request.get("employee_id")
     
@@ -1324,24 +1912,30 @@ async def start_onboarding(request: Dict[str, str] = Body(...), background_tasks
         raise HTTPException(status_code=400, detail="employee_id is required")
     
     # Check if employee exists
-    result = employees_table.search(EmployeeQuery.id == employee_id)
-    if not result:
+    employee = employee_index.get_by_id(employee_id)
+    if employee is None:
         raise HTTPException(status_code=404, detail="Employee not found")
-    
-    employee = result[0]
+
     thread_id = f"thread_{uuid.uuid4()}"
     
     # Update employee with thread ID and started status
-    emp_data = employee.copy()
+    emp_data = employee
     doc_id = employee.doc_id
     
+    now_iso = datetime.now().isoformat()
     emp_data['workflow_thread_id'] = thread_id
-    emp_data['onboarding_status']['started_at'] = datetime.now().isoformat()
-    emp_data['onboarding_status']['last_updated'] = datetime.now().isoformat()
-    emp_data['updated_at'] = datetime.now().isoformat()
-    
-    employees_table.update(emp_data, doc_ids=[doc_id])
-    
+
+    # Partial update: touch only the changed keys on the stored document
+    # instead of writing the whole employee record back
+    def _mark_started(doc: Dict[str, Any]) -> None:
+        doc['workflow_thread_id'] = thread_id
+        doc['updated_at'] = now_iso
+        doc['onboarding_status'].update({'started_at': now_iso, 'last_updated': now_iso})
+
+    employees_table.update(_mark_started, doc_ids=[doc_id])
+    employee_index.register(emp_data, doc_id)
+    await flush_db_async()
+
     # Prepare initial state for workflow
     initial_state = {
         "employee_id": employee_id,
@@ -1359,13 +1953,18 @@ async def start_onboarding(request: Dict[str, str] = Body(...), background_tasks
         "documents_sent": [],
         "documents_signed": [],
         "quizzes_passed": [],
-        "final_tasks_status": {"slack": False, "jira": False, "call": False}
+        "final_tasks_status": {"slack": False, "jira": False, "call": False},
+        "company_policy_signed": False,
+        "nda_signed": False,
+        "dev_guidelines_signed": False,
+        "quiz_passes": {},
+        "history": []
     }
     
     # Start workflow in background
     async def run_workflow():
         try:
-            config = {"configurable": {"thread_id": thread_id}}
+            config = _config_for_thread(thread_id)
             await onboarding_workflow.ainvoke(initial_state, config)
             logger.info(f"Workflow completed for employee {employee_id}")
         except ValueError as e:
@@ -1379,13 +1978,12 @@ async def start_onboarding(request: Dict[str, str] = Body(...), background_tasks
     
     # Store thread ID for resume functionality
     workflow_threads[employee_id] = thread_id
-    
-    if background_tasks:
-        background_tasks.add_task(run_workflow)
-    else:
-        # Run directly if no background tasks available
-        asyncio.create_task(run_workflow())
-    
+
+    # FastAPI always injects BackgroundTasks for a non-Optional parameter,
+    # so the workflow start is tied to the response lifecycle instead of a
+    # detached create_task that nothing awaits or cancels
+    background_tasks.add_task(run_workflow)
+
     logger.info(f"Started onboarding for employee {employee_id} with thread {thread_id}")
     
     return {
@@ -1410,7 +2008,70 @@ class SMTPEmailService:
         
         if not self.username or not self.password:
             logger.warning("⚠️  Ethereal SMTP credentials not found! Emails will not be sent.")
-    
+
+        # Persistent connection: TLS + AUTH dominate per-email latency, so
+        # one session is reused across sends (guarded by the lock - SMTP is
+        # stateful and strictly sequential per connection)
+        self._client: Optional[aiosmtplib.SMTP] = None
+        self._lock = asyncio.Lock()
+
+        # Pre-rendered RFC822 envelope: the MIME scaffolding is identical
+        # for every message this service sends, so only the per-message
+        # fields are substituted. Python's email package (header folding,
+        # encoder selection) is kept as the fallback for non-ASCII content.
+        self._boundary = f"hrms-{uuid.uuid4().hex}"
+        self._mime_template = string.Template(
+            "Subject: ${subject}\r\n"
+            "From: ${from_header}\r\n"
+            "To: ${to}\r\n"
+            "MIME-Version: 1.0\r\n"
+            f'Content-Type: multipart/alternative; boundary="{self._boundary}"\r\n'
+            "\r\n"
+            f"--{self._boundary}\r\n"
+            'Content-Type: text/html; charset="utf-8"\r\n'
+            "Content-Transfer-Encoding: 7bit\r\n"
+            "\r\n"
+            "${body}\r\n"
+            f"--{self._boundary}--\r\n"
+        )
+
+    def _render_raw_message(self, to_email: str, subject: str, body: str,
+                            from_header: str) -> Optional[str]:
+        """Substitute the precomputed envelope; None when MIME encoding is needed"""
+        if not all(part.isascii() for part in (to_email, subject, body, from_header)):
+            return None
+        if '\r' in subject or '\n' in subject or self._boundary in body:
+            return None
+        return self._mime_template.substitute(
+            subject=subject, from_header=from_header, to=to_email, body=body
+        )
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(hostname=self.host, port=self.port, start_tls=True)
+        await client.connect()
+        await client.login(self.username, self.password)
+        return client
+
+    async def _ensure_client(self) -> aiosmtplib.SMTP:
+        """Return a live connection, reconnecting if the server dropped it"""
+        if self._client is not None:
+            try:
+                await self._client.noop()
+                return self._client
+            except Exception:
+                self._client = None
+        self._client = await self._connect()
+        return self._client
+
+    async def close(self):
+        """Quit the persistent session (shutdown path)"""
+        if self._client is not None:
+            try:
+                await self._client.quit()
+            except Exception:
+                pass
+            self._client = None
+
     async def send_email(self, to_email: str, subject: str, body: str, from_email: str = None, from_name: str = "HRMS System") -> bool:
         """Send email via SMTP"""
         try:
@@ -1420,26 +2081,32 @@ class SMTPEmailService:
                 
             if not from_email:
                 from_email = self.username
-                
-            # Create message
-            message = MIMEMultipart('alternative')
-            message['Subject'] = subject
-            message['From'] = f"{from_name} <{from_email}>"
-            message['To'] = to_email
-            
-            # Add HTML body
-            html_part = MIMEText(body, 'html')
-            message.attach(html_part)
-            
-            # Send email
-            await aiosmtplib.send(
-                message,
-                hostname=self.host,
-                port=self.port,
-                start_tls=True,
-                username=self.username,
-                password=self.password,
-            )
+
+            from_header = f"{from_name} <{from_email}>"
+            raw = self._render_raw_message(to_email, subject, body, from_header)
+            if raw is None:
+                # Non-ASCII content - build the message properly
+                message = MIMEMultipart('alternative')
+                message['Subject'] = subject
+                message['From'] = from_header
+                message['To'] = to_email
+                message.attach(MIMEText(body, 'html'))
+
+            async def _deliver(client: aiosmtplib.SMTP):
+                if raw is not None:
+                    await client.sendmail(from_email, [to_email], raw)
+                else:
+                    await client.send_message(message)
+
+            # Send over the persistent session instead of a fresh
+            # connect/STARTTLS/AUTH handshake per message
+            async with self._lock:
+                client = await self._ensure_client()
+                try:
+                    await _deliver(client)
+                except aiosmtplib.SMTPServerDisconnected:
+                    self._client = await self._connect()
+                    await _deliver(self._client)
             
             logger.info(f"📧 Email sent to {to_email}: {subject}")
             logger.info(f"🌐 View email at: {self.web_url}")
@@ -1456,50 +2123,55 @@ smtp_email_service = SMTPEmailService()
 # Webhook Endpoints for External Services
 # ============================================
 
+# Webhook payload -> status-field mappings, built once at import instead
+# of as dict literals per request.
+# Note: doc-esign sends "nda_policy" but we track it as "nda"
+_DOC_STATUS_MAPPING = {
+    "company_policy": {
+        "sent": "company_policy_sent",
+        "signed": "company_policy_signed"
+    },
+    "nda": {
+        "sent": "nda_sent",
+        "signed": "nda_signed"
+    },
+    "nda_policy": {  # doc-esign sends this format
+        "sent": "nda_sent",
+        "signed": "nda_signed"
+    },
+    "dev_guidelines": {
+        "sent": "dev_guidelines_sent",
+        "signed": "dev_guidelines_signed"
+    }
+}
+
+_QUIZ_STATUS_MAPPING = {
+    "company_policy_quiz": "company_policy_quiz_passed",
+    "nda_quiz": "nda_quiz_passed",
+    "dev_guidelines_quiz": "dev_guidelines_quiz_passed"
+}
+
 @app.post("/api/webhooks/document-status")
-async def webhook_document_status(webhook_data: Dict[str, Any] = Body(...)):
+async def webhook_document_status(background_tasks: BackgroundTasks, webhook_data: DocStatusWebhook):
     """Handle document status updates from doc-esign service"""
     try:
-        employee_id = webhook_data.get("employee_id")
-        document_type = webhook_data.get("document_type")
-        status = webhook_data.get("status")
-        
-        if not all([employee_id, document_type, status]):
-            raise HTTPException(status_code=400, detail="Missing required fields")
-        
-        # Map document type to status field
-        # Note: doc-esign sends "nda_policy" but we track it as "nda"
-        status_mapping = {
-            "company_policy": {
-                "sent": "company_policy_sent",
-                "signed": "company_policy_signed"
-            },
-            "nda": {
-                "sent": "nda_sent",
-                "signed": "nda_signed"
-            },
-            "nda_policy": {  # doc-esign sends this format
-                "sent": "nda_sent",
-                "signed": "nda_signed"
-            },
-            "dev_guidelines": {
-                "sent": "dev_guidelines_sent",
-                "signed": "dev_guidelines_signed"
-            }
-        }
-        
-        if document_type in status_mapping and status in ["sent", "signed"]:
-            field = status_mapping[document_type][status]
+        employee_id = webhook_data.employee_id
+        document_type = webhook_data.document_type
+        status = webhook_data.status
+
+        field = _DOC_STATUS_MAPPING.get(document_type, {}).get(status)
+        if field is not None:
             await update_employee_step_status(
                 employee_id,
                 field,
                 OnboardingStepStatus.COMPLETED
             )
             
-            # Resume workflow if interrupted
+            # Resume workflow in the background so the webhook responds
+            # immediately instead of blocking on downstream sends
             # Normalize document type for resume (nda_policy -> nda)
             resume_doc_type = "nda" if document_type == "nda_policy" else document_type
-            await resume_workflow_if_needed(employee_id, f"{resume_doc_type}_{status}")
+            background_tasks.add_task(resume_workflow_if_needed, employee_id, f"{resume_doc_type}_{status}")
             
         logger.info(f"Document webhook: {document_type} {status} for employee {employee_id}")
         return {"status": "received", "processed": True}
@@ -1508,17 +2180,14 @@ async def webhook_document_status(webhook_data: Dict[str, Any] = Body(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/webhooks/quiz-status")
-async def webhook_quiz_status(webhook_data: Dict[str, Any] = Body(...)):
+async def webhook_quiz_status(background_tasks: BackgroundTasks, webhook_data: QuizStatusWebhook):
     """Handle quiz completion updates from doc-esign service"""
     try:
-        employee_id = webhook_data.get("employee_id")
-        quiz_type = webhook_data.get("quiz_type")
-        score = webhook_data.get("score")
-        passed = webhook_data.get("passed")
-        
-        if not all([employee_id, quiz_type, score is not None, passed is not None]):
-            raise HTTPException(status_code=400, detail="Missing required fields")
-        
+        employee_id = webhook_data.employee_id
+        quiz_type = webhook_data.quiz_type
+        score = webhook_data.score
+        passed = webhook_data.passed
+
         # Verify prerequisites before accepting quiz completion
         employee = get_employee_by_id(employee_id)
         if not employee:
@@ -1546,42 +2215,32 @@ async def webhook_quiz_status(webhook_data: Dict[str, Any] = Body(...)):
                 raise HTTPException(status_code=400, detail="Company policy must be signed before quiz")
         
         # Update quiz status only if prerequisites are met
-        status_mapping = {
-            "company_policy_quiz": "company_policy_quiz_passed",
-            "nda_quiz": "nda_quiz_passed",
-            "dev_guidelines_quiz": "dev_guidelines_quiz_passed"
-        }
-        
-        if quiz_type in status_mapping and passed:
-            field = status_mapping[quiz_type]
+        field = _QUIZ_STATUS_MAPPING.get(quiz_type)
+        if field is not None and passed:
             await update_employee_step_status(
                 employee_id,
                 field,
                 OnboardingStepStatus.COMPLETED
             )
             
-            # Resume workflow if interrupted
-            await resume_workflow_if_needed(employee_id, f"{quiz_type}_completed")
-            
-        # Store quiz attempt
-        result = employees_table.search(EmployeeQuery.id == employee_id)
-        if result:
-            emp_data = result[0].copy()
-            doc_id = result[0].doc_id
+            # Resume workflow in the background so the webhook responds immediately
+            background_tasks.add_task(resume_workflow_if_needed, employee_id, f"{quiz_type}_completed")
             
-            if "quiz_attempts" not in emp_data:
-                emp_data["quiz_attempts"] = {}
-            if quiz_type not in emp_data["quiz_attempts"]:
-                emp_data["quiz_attempts"][quiz_type] = []
-                
-            emp_data["quiz_attempts"][quiz_type].append({
+        # Store quiz attempt via a function updater: append in place on the
+        # stored document rather than rewriting the whole employee record
+        doc = employee_index.get_by_id(employee_id)
+        if doc is not None:
+            attempt = {
                 "score": score,
                 "passed": passed,
                 "timestamp": datetime.now().isoformat()
-            })
-            
-            employees_table.update(emp_data, doc_ids=[doc_id])
-            
+            }
+            employees_table.update(
+                lambda d: d.setdefault("quiz_attempts", {}).setdefault(quiz_type, []).append(attempt),
+                doc_ids=[doc.doc_id]
+            )
+            await flush_db_async()
+
         logger.info(f"Quiz webhook: {quiz_type} score={score} passed={passed} for employee {employee_id}")
         return {"status": "received", "processed": True}
     except Exception as e:
@@ -1592,27 +2251,30 @@ async def webhook_quiz_status(webhook_data: Dict[str, Any] = Body(...)):
 async def get_onboarding_status(thread_id: str):
     """Get the status of an onboarding workflow"""
     # Find employee by thread ID
-    result = employees_table.search(EmployeeQuery.workflow_thread_id == thread_id)
-    if not result:
+    doc = employee_index.get_by_thread_id(thread_id)
+    if doc is None:
         raise HTTPException(status_code=404, detail="Workflow thread not found")
-    
-    emp_data = result[0].copy()
-    
-    # Parse datetime strings
-    if 'created_at' in emp_data and isinstance(emp_data['created_at'], str):
-        emp_data['created_at'] = datetime.fromisoformat(emp_data['created_at'])
-    if 'updated_at' in emp_data and isinstance(emp_data['updated_at'], str):
-        emp_data['updated_at'] = datetime.fromisoformat(emp_data['updated_at'])
-    
+
+    # No copy: the lookup returns a fresh top-level Document, and only
+    # top-level keys are rebound below (the nested status dict, which IS
+    # shared with the storage cache, is copied where it's parsed)
+    emp_data = doc
+
+    # Parse datetime strings: straight-line loops over the shared
+    # date-key constants instead of one branch per field
+    for key in _EMPLOYEE_DATE_KEYS:
+        value = emp_data.get(key)
+        if isinstance(value, str):
+            emp_data[key] = datetime.fromisoformat(value)
+
     # Parse nested onboarding status
     if 'onboarding_status' in emp_data:
-        status_data = emp_data['onboarding_status']
-        if 'last_updated' in status_data and isinstance(status_data['last_updated'], str):
-            status_data['last_updated'] = datetime.fromisoformat(status_data['last_updated'])
-        if 'started_at' in status_data and isinstance(status_data['started_at'], str):
-            status_data['started_at'] = datetime.fromisoformat(status_data['started_at'])
-        if 'completed_at' in status_data and isinstance(status_data['completed_at'], str):
-            status_data['completed_at'] = datetime.fromisoformat(status_data['completed_at'])
+        # Copy before parsing: the nested dict is shared with the storage cache
+        status_data = emp_data['onboarding_status'].copy()
+        for key in _STATUS_DATE_KEYS:
+            value = status_data.get(key)
+            if isinstance(value, str):
+                status_data[key] = datetime.fromisoformat(value)
         emp_data['onboarding_status'] = OnboardingStatus(**status_data)
     
     employee = Employee(**emp_data)
@@ -1633,15 +2295,28 @@ async def clear_all_data():
     """
     try:
         # Get count before clearing
-        employee_count = len(employees_table.all())
+        employee_count = len(employees_table)
         
         # Clear all employees and their onboarding data
         employees_table.truncate()
+        email_logs_table.truncate()
+        employee_index.clear()
+        _reset_progress_hist()
+        _invalidate_stats_cache()
+        await flush_db_async()
         
-        # Clear workflow checkpointer memory if possible
+        workflow_threads.clear()
+        _thread_configs.clear()
+
+        # Clear workflow checkpointer state if possible
         try:
-            if hasattr(workflow_checkpointer, 'storage'):
-                workflow_checkpointer.storage.clear()
+            backend = getattr(workflow_checkpointer, 'backend', workflow_checkpointer)
+            if hasattr(backend, 'storage'):
+                backend.storage.clear()
+            elif hasattr(backend, 'conn'):
+                await backend.conn.execute("DELETE FROM checkpoints")
+                await backend.conn.execute("DELETE FROM writes")
+                await backend.conn.commit()
         except Exception as e:
             logger.warning(f"Could not clear workflow checkpointer: {e}")
         
@@ -1658,37 +2333,80 @@ async def clear_all_data():
         logger.error(f"Error clearing database: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to clear data: {str(e)}")
 
+# Short-TTL cache for the stats endpoint: monitoring/scraping hits it
+# repeatedly and the computation walks the whole roster
+_stats_cache: Dict[str, Any] = {"value": None, "expires_at": 0.0}
+_STATS_CACHE_TTL = 5.0
+
+def _invalidate_stats_cache():
+    """Drop the cached stats response after any roster/status change"""
+    _stats_cache["expires_at"] = 0.0
+
+# Running progress histogram: bucket counts are maintained on the
+# mutation paths (where a table write is already being paid) so the
+# stats endpoint is O(1) instead of rescanning the roster. Hydrated
+# lazily once from existing rows, then kept in sync incrementally.
+_BUCKET_BY_COUNT = tuple(f"{int((i / 12) * 100)}%" for i in range(13))
+_progress_hist: Counter = Counter()
+_progress_hist_ready = False
+
+def _hydrate_progress_hist():
+    """One-time scan to seed the histogram from persisted rows"""
+    global _progress_hist_ready
+    _progress_hist.clear()
+    # Iterate the table directly - all() would materialize the full list
+    for emp in employees_table:
+        status = emp.get('onboarding_status')
+        if status is None:
+            continue
+        mask = status.get('progress_mask')
+        if mask is None:
+            mask = OnboardingStatus.compute_progress_mask(status)
+        _progress_hist[_BUCKET_BY_COUNT[mask.bit_count()]] += 1
+    _progress_hist_ready = True
+
+def _progress_hist_add(mask: int = 0):
+    """Count a newly created employee into their progress bucket"""
+    if _progress_hist_ready:
+        _progress_hist[_BUCKET_BY_COUNT[mask.bit_count()]] += 1
+
+def _progress_hist_move(old_mask: int, new_mask: int):
+    """Shift one employee between buckets after a status transition"""
+    if not _progress_hist_ready or old_mask == new_mask:
+        return
+    old_bucket = _BUCKET_BY_COUNT[old_mask.bit_count()]
+    new_bucket = _BUCKET_BY_COUNT[new_mask.bit_count()]
+    if old_bucket != new_bucket:
+        _progress_hist[old_bucket] -= 1
+        if _progress_hist[old_bucket] <= 0:
+            del _progress_hist[old_bucket]
+        _progress_hist[new_bucket] += 1
+
+def _reset_progress_hist():
+    """Empty table means an empty histogram - exact, so stays ready"""
+    global _progress_hist_ready
+    _progress_hist.clear()
+    _progress_hist_ready = True
+
 @app.get("/api/admin/stats")
 async def get_admin_stats():
     """Get basic statistics about the system"""
     try:
-        all_employees = employees_table.all()
-        employee_count = len(all_employees)
-        
-        # Count by status
-        status_counts = {}
-        for emp in all_employees:
-            if 'onboarding_status' in emp:
-                # Count completed steps
-                completed_steps = 0
-                total_steps = 12  # Total possible steps
-                status = emp['onboarding_status']
-                
-                for step_key, step_value in status.items():
-                    if step_key.endswith('_at'):  # Skip timestamp fields
-                        continue
-                    if step_value == 'completed':
-                        completed_steps += 1
-                
-                progress_bucket = f"{int((completed_steps/total_steps)*100)}%"
-                status_counts[progress_bucket] = status_counts.get(progress_bucket, 0) + 1
-        
-        return {
-            "total_employees": employee_count,
-            "progress_distribution": status_counts,
-            "database_file": str(Path("hrms.db").absolute()),
+        if _stats_cache["value"] is not None and time.monotonic() < _stats_cache["expires_at"]:
+            return _stats_cache["value"]
+
+        if not _progress_hist_ready:
+            _hydrate_progress_hist()
+
+        stats = {
+            "total_employees": len(employees_table),
+            "progress_distribution": dict(_progress_hist),
+            "database_file": _DB_ABSOLUTE_PATH,
             "timestamp": datetime.now().isoformat()
         }
+        _stats_cache["value"] = stats
+        _stats_cache["expires_at"] = time.monotonic() + _STATS_CACHE_TTL
+        return stats
         
     except Exception as e:
         logger.error(f"Error getting stats: {e}")
@@ -1697,4 +2415,14 @@ async def get_admin_stats():
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port, reload=True)
\ No newline at end of file
+    # uvloop + httptools (bundled with uvicorn[standard]) replace the
+    # pure-Python event loop and HTTP parser; the reload watcher is
+    # opt-in for development only
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        reload=os.getenv("DEV") == "1"
+    )
\ No newline at end of file
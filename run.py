@@ -11,11 +11,13 @@ if __name__ == "__main__":
     # Get port from environment variable (Render provides this)
     port = int(os.getenv("PORT", 8000))
     
-    # Start the server
+    # Start the server (uvloop + httptools ship with uvicorn[standard])
     uvicorn.run(
         "app:app",
         host="0.0.0.0",
         port=port,
+        loop="uvloop",
+        http="httptools",
         log_level="info",
         access_log=True
     )
\ No newline at end of file
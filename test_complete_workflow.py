@@ -9,6 +9,8 @@ import httpx
 import json
 from datetime import datetime
 
+from app import smtp_email_service
+
 async def test_complete_workflow():
     """Test the complete HRMS workflow end-to-end"""
     base_url = "http://localhost:8000"
@@ -84,8 +86,6 @@ async def test_complete_workflow():
         # Step 4: Test Email Service Directly
         print("\n📧 Step 4: Testing SMTP email service...")
         try:
-            from app import smtp_email_service
-            
             success = await smtp_email_service.send_email(
                 to_email=test_email,
                 subject="HRMS Workflow Test - Direct Email",